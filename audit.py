@@ -0,0 +1,108 @@
+import asyncio
+import collections
+import json
+import os
+import time
+
+# ================= AUDIT LOG =================
+# Admin events (registrations, verifications...) used to be posted to the log
+# channels one embed at a time, competing with the claim path for rate-limit
+# budget. record() now only queues the event. A background task flushes the
+# queue every `interval` seconds, or as soon as `max_events` are waiting: it
+# appends the events to a JSON-lines file and hands them, grouped per channel,
+# to `send`, which posts one digest per channel.
+#
+# Every line in the file is one event:
+#     {"at": 1718000000.0, "guild": "123", "kind": "team_saved", "uid": "456", "team": "Alpha"}
+# query() reads it back with simple filters.
+
+
+class AuditLog:
+    def __init__(self, path, send, interval=10.0, max_events=25):
+        """`send(channel, events)` is awaited once per channel and flush with that channel's events."""
+        self.path = path
+        self.send = send
+        self.interval = interval
+        self.max_events = max_events
+        self.queue = []  # (channel or None, event)
+        self.full = asyncio.Event()
+        self.task = None
+        self.written = 0
+        self.digests = 0
+
+    def record(self, guild_id, kind, channel=None, **fields):
+        """Queues one event. Never waits; `channel` is where its digest goes, if anywhere."""
+        event = {"at": round(time.time(), 3), "guild": str(guild_id), "kind": kind, **fields}
+        self.queue.append((channel, event))
+        if len(self.queue) >= self.max_events:
+            self.full.set()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return self.task
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Audit flush failed: {e}")
+
+    async def flush(self):
+        if not self.queue:
+            return
+        batch, self.queue = self.queue, []
+        try:
+            await asyncio.to_thread(self._write, [event for _, event in batch])
+        except OSError as e:
+            print(f"⚠️ Could not write {self.path}: {e}")
+
+        by_channel = {}
+        for channel, event in batch:
+            if channel is not None:
+                by_channel.setdefault(channel, []).append(event)
+        results = await asyncio.gather(
+            *(self.send(channel, events) for channel, events in by_channel.items()),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"⚠️ Audit digest failed: {result}")
+            else:
+                self.digests += 1
+
+    def _write(self, events):
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events))
+        self.written += len(events)
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        await self.flush()
+
+
+def query(path, guild=None, kind=None, uid=None, limit=20):
+    """The newest `limit` events matching every filter given, oldest first."""
+    if not os.path.exists(path):
+        return []
+    matches = collections.deque(maxlen=limit)
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # a torn last line from a crash
+            if guild is not None and event.get("guild") != str(guild): continue
+            if kind is not None and event.get("kind") != kind: continue
+            if uid is not None and str(uid) not in (event.get("uid"), event.get("by")) \
+                    and str(uid) not in event.get("members", []):
+                continue
+            matches.append(event)
+    return list(matches)
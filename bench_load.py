@@ -0,0 +1,213 @@
+"""
+Registration-rush benchmark against fake_discord.py, no live server needed.
+
+    python bench_load.py [teams] [rest_latency_seconds]
+
+Every team registers through TeamModal, claims a match with a SlotButton or
+the Quick Claim button, and a share of them cancel again through the
+CancelDropdown, all at once. Reports throughput, p50/p99 acknowledgement
+latency per flow, REST calls per successful claim, bytes written to
+data.json and its journal, and how long a start notification with DMs to
+every booked team takes. A watcher checks the whole time that no match
+ever holds more than max_slots teams or the same team twice. Exits with
+status 1 if it ever does.
+"""
+import asyncio
+import atexit
+import os
+import random
+import sys
+import tempfile
+import time
+
+# main.py reads and writes its data files in the working directory; keep them out of the working tree,
+# in a temporary directory that is removed on exit (atexit runs the chdir back first).
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+workdir = tempfile.TemporaryDirectory(prefix="bench_load_")
+atexit.register(workdir.cleanup)
+atexit.register(os.chdir, os.getcwd())
+os.chdir(workdir.name)
+import main
+import fake_discord as fd
+
+main.load_state()
+
+CANCEL_SHARE = 0.3
+AUTO_CLAIM_SHARE = 0.3
+
+
+def build_guild(api, teams):
+    guild = fd.FakeGuild(api)
+    config = main.default_guild_config()
+    for key, value in config.items():
+        if key.endswith("_id"):
+            guild.add_channel(key, value)
+    for slot_name, channel_id in config["slot_list_channels"].items():
+        guild.add_channel(f"{slot_name.lower()}-list", channel_id)
+    for slot_name, channel_id in config["room_channels"].items():
+        guild.add_channel(f"{slot_name.lower()}-room", channel_id)
+    for role_name in config["slot_roles"].values():
+        guild.add_role(role_name)
+    guild.add_role(config["verify_role_name"])
+    members = [guild.add_member(f"player{i}") for i in range(teams)]
+    return guild, members
+
+
+def count_write_volume(store):
+    """Wraps the journal behind the write-behind store so every byte it writes is counted."""
+    written = {"journal": 0, "snapshot": 0}
+    if not isinstance(store, main.storage.WriteBehindStore):
+        return None
+    journal = store.journal
+    append_lines, finish = journal.append_lines, journal.finish_compaction
+
+    def counted_append_lines(lines, sync=False):
+        written["journal"] += sum(len(line) + 1 for line in lines)
+        append_lines(lines, sync)
+
+    def counted_finish(payload):
+        written["snapshot"] += len(payload)
+        finish(payload)
+
+    journal.append_lines = counted_append_lines
+    journal.finish_compaction = counted_finish
+    return written
+
+
+class Run:
+    def __init__(self, guild):
+        self.guild = guild
+        self.t = main.get_tournament(guild)
+        self.acks = {}    # flow -> ack latencies
+        self.errors = {}  # flow -> exception count
+        self.claims = 0
+        self.violations = []
+
+    async def interact(self, flow, member, action):
+        interaction = fd.FakeInteraction(self.guild, member)
+        try:
+            await action(interaction)
+        except Exception as e:
+            self.errors[flow] = self.errors.get(flow, 0) + 1
+            print(f"❌ {flow} failed for {member.name}: {e!r}")
+        if interaction.ack_latency is not None:
+            self.acks.setdefault(flow, []).append(interaction.ack_latency)
+        return interaction
+
+    async def register(self, i, member):
+        modal = main.TeamModal()
+        fd.fill(modal.team, f"Team {i}")
+        for n, field in enumerate((modal.p1, modal.p2, modal.p3, modal.p4)):
+            fd.fill(field, f"t{i}p{n}")
+        await self.interact("register", member, modal.on_submit)
+
+    async def claim(self, member):
+        uid = str(member.id)
+        before = len(self.t.teams.get(uid, {}).get("booked_slots", []))
+        if random.random() < AUTO_CLAIM_SHARE:
+            view = main.AutoClaimView()
+            await self.interact("auto_claim", member, lambda i: fd.press(view, "auto_claim", i))
+        else:
+            button = random.choice(main.SlotSelectView(self.t).children)
+            await self.interact("slot_button", member, button.callback)
+        if len(self.t.teams.get(uid, {}).get("booked_slots", [])) > before:
+            self.claims += 1
+
+    async def cancel(self, member):
+        booked = list(self.t.teams.get(str(member.id), {}).get("booked_slots", []))
+        if not booked: return
+        dropdown = main.CancelDropdown(booked)
+        fd.choose(dropdown, [random.choice(booked + ["ALL"])])
+        await self.interact("cancel", member, dropdown.callback)
+
+    async def team_flow(self, i, member):
+        await asyncio.sleep(random.random())
+        await self.register(i, member)
+        await self.claim(member)
+        if random.random() < CANCEL_SHARE:
+            await self.cancel(member)
+            await self.claim(member)
+
+    def check_tables(self):
+        """Each live table must be one message that is edited in place, never posted again."""
+        for slot_name, channel_id in self.t.slot_list_channels.items():
+            channel = self.guild.get_channel(channel_id)
+            posted = len(channel.messages) if channel else 0
+            if posted > 1:
+                self.violations.append(f"{slot_name} table was posted {posted} times")
+            elif posted and self.t.table_messages.get(slot_name) not in channel.messages:
+                self.violations.append(f"{slot_name} table id was not saved")
+
+    def check_slots(self):
+        for slot_name, uids in self.t.slots.items():
+            if len(uids) > self.t.max_slots:
+                self.violations.append(f"{slot_name} holds {len(uids)}/{self.t.max_slots}")
+            if len(uids) != len(set(uids)):
+                self.violations.append(f"{slot_name} lists a team twice")
+
+    async def watch(self):
+        while True:
+            self.check_slots()
+            await asyncio.sleep(0.01)
+
+
+def pct(values, p):
+    return main.percentile(values, p) if values else float("nan")
+
+
+async def bench(teams, latency):
+    api = fd.FakeAPI(latency=latency)
+    guild, members = build_guild(api, teams)
+    written = count_write_volume(main.store)
+    run = Run(guild)
+
+    watcher = asyncio.create_task(run.watch())
+    main.audit_log.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(run.team_flow(i, m) for i, m in enumerate(members)))
+    elapsed = time.perf_counter() - started
+    # Let role syncs and the coalesced table edits finish before counting REST calls.
+    await asyncio.gather(*list(main.background_tasks))
+    await asyncio.sleep(main.TABLE_REFRESH_INTERVAL * 2)
+    await main.audit_log.close()
+    if written is not None:
+        await asyncio.to_thread(main.store.flush)
+    watcher.cancel()
+    run.check_slots()
+    run.check_tables()
+
+    interactions = sum(len(v) for v in run.acks.values())
+    print(f"\n🏁 {teams} teams, {interactions} interactions in {elapsed:.1f}s "
+          f"({interactions / elapsed:.0f}/s), simulated REST latency {latency * 1000:.0f}ms")
+    print(f"{'FLOW':<12} {'N':>6} {'ACK p50':>9} {'ACK p99':>9} {'ERRORS':>7}")
+    for flow, acks in sorted(run.acks.items()):
+        print(f"{flow:<12} {len(acks):>6} {pct(acks, 50):>8.3f}s {pct(acks, 99):>8.3f}s {run.errors.get(flow, 0):>7}")
+
+    print(f"\nSuccessful claims: {run.claims}")
+    if run.claims:
+        print(f"REST calls per claim: {api.total() / run.claims:.1f} ({api.total()} total)")
+    for route, n in api.calls.most_common(8):
+        print(f"  {n:>7}  {route}  ({api.rate_limited[route]} waits on rate limit)")
+    if written is not None:
+        print(f"data.json writes: {written['journal'] / 1024:.1f} KiB journal, "
+              f"{written['snapshot'] / 1024:.1f} KiB snapshots in {main.store.writes} disk writes")
+
+    filled = ", ".join(f"{s} {len(u)}/{run.t.max_slots}" for s, u in run.t.slots.items())
+    print(f"Final fill: {filled}")
+
+    report, duration = await main.send_start_notifications(guild, 10, dm=True)
+    print(f"Start notification with DMs: {report['channels']} channels, {report['dms']} DMs "
+          f"({report['dms_failed']} failed) in {duration:.1f}s")
+    if run.violations:
+        print(f"❌ Invariant broken {len(run.violations)} times, first: {run.violations[0]}")
+        return False
+    print("✅ No match ever exceeded max_slots or listed a team twice, every table was edited in place")
+    return True
+
+
+if __name__ == "__main__":
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    ok = asyncio.run(bench(teams, latency))
+    main.store.close()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,110 @@
+"""
+Compares how much memory one large guild costs in the full and lean gateway
+modes (GATEWAY_MODE in main.py).
+
+    python bench_memory.py [members] [roles] [interacting_members]
+
+A synthetic GUILD_CREATE payload is fed to discord.py's own guild parser
+with each mode's client options, and the memory it keeps is measured with
+tracemalloc. Lean mode also fills the member LRU with the members that
+interacted, as the bot would during a busy evening.
+"""
+import atexit
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import discord
+
+# main.py reads guilds.json from the working directory on import; keep it out of the working tree,
+# in a temporary directory that is removed on exit (atexit runs the chdir back first).
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+workdir = tempfile.TemporaryDirectory(prefix="bench_memory_")
+atexit.register(workdir.cleanup)
+atexit.register(os.chdir, os.getcwd())
+os.chdir(workdir.name)
+import main
+
+GUILD_ID = 1 << 40
+
+
+def snowflake(i):
+    return str(GUILD_ID + i)
+
+
+def guild_payload(members, roles):
+    role_ids = [snowflake(1_000_000 + i) for i in range(roles)]
+    return {
+        "id": str(GUILD_ID),
+        "name": "Synthetic Guild",
+        "owner_id": snowflake(0),
+        "member_count": members,
+        "large": True,
+        "roles": [
+            {"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0,
+             "color": 0, "hoist": False, "managed": False, "mentionable": False}
+        ] + [
+            {"id": rid, "name": f"Role {i}", "permissions": "0", "position": i + 1,
+             "color": 0, "hoist": False, "managed": False, "mentionable": True}
+            for i, rid in enumerate(role_ids)
+        ],
+        "channels": [
+            {"id": snowflake(2_000_000 + i), "type": 0, "name": f"channel-{i}", "position": i,
+             "permission_overwrites": []}
+            for i in range(50)
+        ],
+        "members": [
+            {"user": {"id": snowflake(i), "username": f"player{i}", "discriminator": "0",
+                      "avatar": None, "global_name": f"Player {i}"},
+             "roles": role_ids[i % roles:i % roles + 3], "joined_at": "2024-01-01T00:00:00+00:00",
+             "deaf": False, "mute": False, "flags": 0}
+            for i in range(members)
+        ],
+        "presences": [
+            {"user": {"id": snowflake(i)}, "status": "online", "client_status": {"desktop": "online"},
+             "activities": [{"name": "BGMI", "type": 0}]}
+            for i in range(0, members, 3)
+        ],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+    }
+
+
+def measure(lean, payload, interacting):
+    client = discord.Client(**main.gateway_options(lean))
+    state = client._connection
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+
+    guild = discord.Guild(data=payload, state=state)
+    member_cache = main.MemberCache(main.MEMBER_CACHE_SIZE)
+    if lean:
+        for member_data in payload["members"][:interacting]:
+            member_cache.put(discord.Member(data=member_data, guild=guild, state=state))
+
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    cached = len(guild._members) + len(member_cache.members)
+    del guild, member_cache, client, state
+    gc.collect()
+    return used, cached
+
+
+if __name__ == "__main__":
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    roles = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    interacting = int(sys.argv[3]) if len(sys.argv) > 3 else 1_500
+    payload = guild_payload(members, roles)
+
+    tracemalloc.start()
+    print(f"Synthetic guild: {members} members, {roles} roles, {interacting} interacting")
+    results = {}
+    for mode, lean in (("full", False), ("lean", True)):
+        used, cached = measure(lean, payload, interacting)
+        results[mode] = used
+        print(f"{mode:<5} {used / 1024 / 1024:>8.1f} MiB  {cached:>7} members cached")
+    print(f"lean saves {(results['full'] - results['lean']) / 1024 / 1024:.1f} MiB "
+          f"({100 * (1 - results['lean'] / results['full']):.0f}%)")
@@ -0,0 +1,345 @@
+"""
+In-process stand-ins for the parts of discord.py that main.py touches:
+guilds, roles, channels, members, messages and interactions. Used by
+bench_load.py to drive the bot without a live server.
+
+Every call that would reach Discord's REST API goes through FakeAPI, which
+counts it per route, sleeps a simulated latency and waits out per-route
+rate limits the way discord.py does.
+"""
+import asyncio
+import collections
+import itertools
+import random
+import time
+
+import discord
+
+_ids = itertools.count(1 << 50)
+
+
+def next_id():
+    return next(_ids)
+
+
+class FakeHTTPResponse:
+    """The bits of an aiohttp response discord.HTTPException reads."""
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+
+def not_found(what):
+    return discord.NotFound(FakeHTTPResponse(404, "Not Found"), f"Unknown {what}")
+
+
+class Bucket:
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+
+class FakeAPI:
+    # (requests, seconds) per bucket, roughly what Discord hands out for these routes.
+    LIMITS = {
+        "POST /channels/{id}/messages": (5, 5.0),
+        "PATCH /channels/{id}/messages/{id}": (5, 5.0),
+        "PATCH /channels/{id}": (2, 10.0),
+        "PUT /guilds/{id}/members/{id}/roles/{id}": (10, 10.0),
+        "DELETE /guilds/{id}/members/{id}/roles/{id}": (10, 10.0),
+        "POST /users/@me/channels": (5, 5.0),
+    }
+
+    def __init__(self, latency=0.05, jitter=0.02):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = collections.Counter()
+        self.rate_limited = collections.Counter()
+        self.buckets = {}
+
+    async def call(self, route, major=None):
+        """One REST request. `major` is the id the bucket is keyed on (channel, guild...)."""
+        self.calls[route] += 1
+        limit = self.LIMITS.get(route)
+        if limit:
+            bucket = self.buckets.setdefault((route, major), Bucket(*limit))
+            while True:
+                now = time.monotonic()
+                if now >= bucket.reset_at:
+                    bucket.remaining = bucket.limit
+                    bucket.reset_at = now + bucket.per
+                if bucket.remaining > 0:
+                    bucket.remaining -= 1
+                    break
+                self.rate_limited[route] += 1
+                await asyncio.sleep(bucket.reset_at - now)
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+# --- Guild objects ---
+class FakeRole:
+    def __init__(self, guild, name, role_id=None):
+        self.guild = guild
+        self.id = role_id or next_id()
+        self.name = name
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    @property
+    def members(self):
+        return [m for m in self.guild._members.values() if self in m.roles]
+
+    def __repr__(self):
+        return f"<FakeRole {self.name}>"
+
+
+class FakeMember:
+    def __init__(self, guild, name, member_id=None):
+        self.guild = guild
+        self.id = member_id or next_id()
+        self.name = name
+        self.display_name = name
+        self.roles = []
+        self.dms = []
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    async def add_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.guild.api.call("PUT /guilds/{id}/members/{id}/roles/{id}", self.guild.id)
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.guild.api.call("DELETE /guilds/{id}/members/{id}/roles/{id}", self.guild.id)
+            if role in self.roles:
+                self.roles.remove(role)
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.api.call("POST /users/@me/channels")
+        await self.guild.api.call("POST /channels/{id}/messages", ("dm", self.id))
+        self.dms.append(content)
+
+    def __repr__(self):
+        return f"<FakeMember {self.name}>"
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embed=None, view=None):
+        self.channel = channel
+        self.id = next_id()
+        self.content = content
+        self.embed = embed
+        self.view = view
+
+    @property
+    def embeds(self):
+        return [self.embed] if self.embed is not None else []
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await self.channel.guild.api.call("PATCH /channels/{id}/messages/{id}", self.channel.id)
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+
+    async def delete(self):
+        await self.channel.guild.api.call("DELETE /channels/{id}/messages/{id}", self.channel.id)
+        self.channel.messages.pop(self.id, None)
+
+
+class FakePartialMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def fetch(self):
+        await self.channel.guild.api.call("GET /channels/{id}/messages/{id}", self.channel.id)
+        message = self.channel.messages.get(self.id)
+        if message is None:
+            raise not_found("Message")
+        return message
+
+    async def edit(self, **kwargs):
+        message = self.channel.messages.get(self.id)
+        if message is None:
+            await self.channel.guild.api.call("PATCH /channels/{id}/messages/{id}", self.channel.id)
+            raise not_found("Message")
+        await message.edit(**kwargs)
+
+
+class FakeChannel:
+    def __init__(self, guild, name, channel_id=None):
+        self.guild = guild
+        self.id = channel_id or next_id()
+        self.name = name
+        self.messages = {}
+        self.overwrites = {}
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        await self.guild.api.call("POST /channels/{id}/messages", self.id)
+        message = FakeMessage(self, content, embed, view)
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self, message_id)
+
+    async def edit(self, overwrites=None, **kwargs):
+        await self.guild.api.call("PATCH /channels/{id}", self.id)
+        if overwrites is not None:
+            self.overwrites = dict(overwrites)
+
+    async def purge(self, limit=100):
+        await self.guild.api.call("GET /channels/{id}/messages", self.id)
+        deleted = list(self.messages.values())[-limit:]
+        for message in deleted:
+            self.messages.pop(message.id, None)
+        await self.guild.api.call("POST /channels/{id}/messages/bulk-delete", self.id)
+        return deleted
+
+
+class FakeGuild:
+    def __init__(self, api, name="Load Test", guild_id=None):
+        self.api = api
+        self.id = guild_id or next_id()
+        self.name = name
+        self.default_role = FakeRole(self, "@everyone", self.id)
+        self._roles = {self.id: self.default_role}
+        self._channels = {}
+        self._members = {}
+        self.me = self.add_member("SlotBot")
+
+    # Setup helpers, not part of discord.py's API.
+    def add_channel(self, name, channel_id=None):
+        channel = FakeChannel(self, name, channel_id)
+        self._channels[channel.id] = channel
+        return channel
+
+    def add_role(self, name):
+        role = FakeRole(self, name)
+        self._roles[role.id] = role
+        return role
+
+    def add_member(self, name):
+        member = FakeMember(self, name)
+        self._members[member.id] = member
+        return member
+
+    @property
+    def roles(self):
+        return list(self._roles.values())
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+    async def fetch_member(self, member_id):
+        await self.api.call("GET /guilds/{id}/members/{id}", self.id)
+        member = self._members.get(member_id)
+        if member is None:
+            raise not_found("Member")
+        return member
+
+    async def create_role(self, name=None, mentionable=False, **kwargs):
+        await self.api.call("POST /guilds/{id}/roles", self.id)
+        return self.add_role(name)
+
+
+# --- Interactions ---
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _ack(self):
+        if self._done:
+            raise discord.InteractionResponded(self.interaction)
+        self._done = True
+        await self.interaction.api.call("POST /interactions/{id}/{token}/callback")
+        self.interaction.acked_at = time.perf_counter()
+
+    async def defer(self, ephemeral=False, thinking=False):
+        await self._ack()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._ack()
+        self.interaction.sent.append(content)
+
+    async def send_modal(self, modal):
+        await self._ack()
+        self.interaction.sent.append(modal)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.api.call("POST /webhooks/{id}/{token}")
+        self.interaction.sent.append(content if content is not None else kwargs.get("embed"))
+
+
+class FakeInteraction:
+    def __init__(self, guild, user):
+        self.api = guild.api
+        self.id = next_id()
+        self.guild = guild
+        self.user = user
+        self.created_at = discord.utils.utcnow()
+        self.extras = {}
+        self.started = time.perf_counter()
+        self.acked_at = None
+        self.sent = []
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+
+    @property
+    def ack_latency(self):
+        return None if self.acked_at is None else self.acked_at - self.started
+
+
+# --- Driving discord.ui components ---
+def fill(text_input, value):
+    """Sets what the user typed into a modal's TextInput."""
+    text_input._value = value
+
+
+def choose(select, values):
+    """Sets what the user picked in a Select."""
+    select._values = list(values)
+
+
+async def press(view, name, interaction):
+    """Clicks the @discord.ui.button method `name` on a view."""
+    item = getattr(view, name)
+    if isinstance(item, discord.ui.Item):
+        await item.callback(interaction)
+    else:
+        await item(interaction, None)
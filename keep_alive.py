@@ -1,18 +1,47 @@
-from flask import Flask
-from threading import Thread
+from aiohttp import web
 import os
 
-app = Flask('')
+# Runs on the bot's own event loop, no extra thread. Hosting services ping
+# "/" to keep the bot awake; the other routes are for monitoring:
+#   /healthz  the process and its event loop are responsive
+#   /readyz   503 unless every check from `ready()` passes
+#   /status   JSON summary from `status()`
+#   /metrics  Prometheus text format, only when a `metrics` renderer is given
 
-@app.route('/')
-def home():
-    return "Bot is alive!"
+async def keep_alive(ready, status, metrics=None):
+    """
+    Starts the HTTP server on PORT and returns its runner. `ready` returns
+    (is_ready, checks) and `status` a JSON-serializable dict; both are
+    called on every request.
+    """
+    async def home(request):
+        return web.Response(text="Bot is alive!")
 
-def run():
+    async def healthz(request):
+        return web.json_response({"ok": True})
+
+    async def readyz(request):
+        ok, checks = ready()
+        return web.json_response({"ok": ok, "checks": checks}, status=200 if ok else 503)
+
+    async def status_route(request):
+        return web.json_response(status())
+
+    async def metrics_route(request):
+        return web.Response(text=metrics(), content_type="text/plain")
+
+    app = web.Application()
+    app.add_routes([
+        web.get("/", home),
+        web.get("/healthz", healthz),
+        web.get("/readyz", readyz),
+        web.get("/status", status_route),
+    ])
+    if metrics:
+        app.add_routes([web.get("/metrics", metrics_route)])
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
     # Uses the PORT provided by the hosting service or defaults to 8080
     port = int(os.environ.get("PORT", 8080))
-    app.run(host='0.0.0.0', port=port)
-
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    return runner
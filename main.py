@@ -1,13 +1,26 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import ui
 import json
 import os
+import signal
 import asyncio
 import datetime
+import time
+import functools
+import collections
+import contextlib
+import csv
+import heapq
+import io
+import audit
 import keep_alive
+import metrics
+import storage
 
 # ================= 1. CONFIGURATION =================
+# The values below are the defaults for the server this bot was first built
+# for. Every other server is configured in guilds.json (see section 2).
 TOKEN = os.environ.get("TOKEN")
 
 # --- CHANNELS ---
@@ -47,109 +60,580 @@ VERIFY_ROLE_NAME = "Verified Team"
 # --- SETTINGS ---
 MAX_SLOTS = 16
 DATA_FILE = "data.json"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "journal")  # "journal" or "sqlite"
+SQLITE_FILE = "data.db"
+SAVE_INTERVAL = 1.0  # Seconds the journal writer waits to batch changes into one disk write
+GUILD_CONFIG_FILE = "guilds.json"
+AUDIT_LOG_FILE = "audit.jsonl"  # Every admin-log event, one JSON object per line (!audit reads it)
+AUDIT_FLUSH_INTERVAL = 10.0  # Seconds between admin-log digests...
+AUDIT_BATCH_SIZE = 25  # ...or sooner, once this many events are waiting
 REGISTRATION_OPEN = True
 TIMEZONE_OFFSET = 5.5 # India Standard Time
 DATA_EXPIRY_DAYS = 7  # Delete team data after 7 days
+TABLE_REFRESH_INTERVAL = 2.0  # Min seconds between two edits of the same live table
+TABLE_RETRY_MAX = 60.0  # Longest wait between retries of a table edit Discord failed on its side
+LATENCY_SAMPLES = 500  # Recent samples kept per interaction handler
+RESET_ROLE_CONCURRENCY = 5  # Parallel role removals during the midnight reset
+BULK_ROLE_CONCURRENCY = 5  # Parallel role grants after !import_teams
+VERIFY_ROLE_CONCURRENCY = 8  # Parallel role grants across all running verifications
+SETUP_EDIT_CONCURRENCY = 4  # Parallel channel edits during !setup
+NOTIFY_DM_CONCURRENCY = 4  # Parallel DMs to teams from !notify_start ... dm
+GATEWAY_MODE = os.environ.get("GATEWAY_MODE", "full")  # "full" caches the whole guild, "lean" only what the bot reads
+LEAN_GATEWAY = GATEWAY_MODE == "lean"
+MEMBER_CACHE_SIZE = 2000  # Members kept in lean mode (recent interactions and on-demand fetches)
+READY_MAX_LATENCY = 5.0  # Gateway heartbeat latency (seconds) above which /readyz fails
+METRICS_ENABLED = os.environ.get("METRICS", "0") == "1"  # Prometheus metrics on /metrics
 
 # ================= 2. DATA HANDLING =================
+# Must be set before the @metrics.timed functions below are defined.
+metrics.enabled = METRICS_ENABLED
+
+if STORAGE_BACKEND == "sqlite":
+    # Migrates data.json into SQLite the first time it starts.
+    store = storage.SQLiteStore(SQLITE_FILE, DATA_FILE)
+else:
+    # Journal writes and snapshots happen on a writer thread, see storage.WriteBehindStore.
+    store = storage.WriteBehindStore(storage.JournalStore(DATA_FILE), SAVE_INTERVAL)
+
+if METRICS_ENABLED:
+    # The disk work runs on the store's own thread, so it is timed there.
+    if isinstance(store, storage.WriteBehindStore):
+        store.journal.append_lines = metrics.timed(
+            "slotbot_journal_write", "Batched journal writes incl. fsync (writer thread)")(store.journal.append_lines)
+        store.journal.compact = metrics.timed(
+            "slotbot_snapshot", "Full snapshot writes (writer thread)")(store.journal.compact)
+    else:
+        store._apply = metrics.timed("slotbot_sqlite_write", "SQLite mirror writes (worker thread)")(store._apply)
+    store_queue = metrics.Gauge("slotbot_store_queue", "Changes waiting for the store's writer thread")
+    metrics.collectors.append(lambda: store_queue.set(store.queued()))
+
 def load_data():
-    if not os.path.exists(DATA_FILE):
-        default_data = {
-            "teams": {}, 
-            "slots": {k: [] for k in SLOT_LIST_CHANNELS},
-            "table_messages": {} 
-        }
-        with open(DATA_FILE, "w") as f:
-            json.dump(default_data, f, indent=4)
-        return default_data
-    
-    with open(DATA_FILE, "r") as f:
-        data = json.load(f)
-        if "table_messages" not in data:
-            data["table_messages"] = {}
-        if "SLOT_1" in data["slots"]:
-            new_slots = {k.replace("SLOT", "MATCH"): v for k, v in data["slots"].items()}
-            data["slots"] = new_slots
-            save_data(data)
-        return data
-
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-data = load_data()
+    default_data = {
+        "guilds": {},
+        "schedule": {"last_run": {}, "jobs": {}}
+    }
+    return store.load(default_data)
+
+@metrics.timed("slotbot_log_change", "Queueing one change for the store (event loop)")
+def log_change(op, **fields):
+    """Queues one mutation for the journal; the store decides when it reaches the disk."""
+    store.append(op, **fields)
+
+# Loaded by SlotBot.setup_hook, before the persistent views are registered
+# and before the gateway can deliver a single event. Tools importing this
+# module call load_state() themselves.
+data = None
+
+def load_state():
+    global data
+    if data is None:
+        data = load_data()
+    return data
+
+# --- Per-guild configuration ---
+# guilds.json maps a guild id to its settings. Any key left out falls back to
+# the defaults in section 1, e.g.:
+#   {"123456789012345678": {"admin_command_channel_id": 1, "slot_list_channels": {"MATCH_1": 2},
+#                           "room_channels": {"MATCH_1": 3}, "slot_roles": {"MATCH_1": "Match 1 Player"},
+#                           "max_slots": 12, "timezone_offset": 0}}
+def default_guild_config():
+    return {
+        "admin_command_channel_id": ADMIN_COMMAND_CHANNEL_ID,
+        "registration_channel_id": REGISTRATION_CHANNEL_ID,
+        "cancel_claim_channel_id": CANCEL_CLAIM_CHANNEL_ID,
+        "admin_log_channel_id": ADMIN_LOG_CHANNEL_ID,
+        "verify_channel_id": VERIFY_CHANNEL_ID,
+        "verified_team_log_id": VERIFIED_TEAM_LOG_ID,
+        "slot_list_channels": dict(SLOT_LIST_CHANNELS),
+        "room_channels": dict(ROOM_CHANNELS),
+        "slot_roles": dict(SLOT_ROLES),
+        "verify_role_name": VERIFY_ROLE_NAME,
+        "max_slots": MAX_SLOTS,
+        "timezone_offset": TIMEZONE_OFFSET,
+        "data_expiry_days": DATA_EXPIRY_DAYS,
+    }
+
+def load_guild_configs():
+    if not os.path.exists(GUILD_CONFIG_FILE):
+        return {}
+    with open(GUILD_CONFIG_FILE, "r") as f:
+        raw = json.load(f)
+    configs = {}
+    for guild_id, overrides in raw.items():
+        config = default_guild_config()
+        # Only known settings; anything else would land on the Tournament as an attribute.
+        unknown = sorted(set(overrides) - set(config))
+        if unknown:
+            print(f"⚠️ {GUILD_CONFIG_FILE}: ignoring unknown settings for guild {guild_id}: {', '.join(unknown)}")
+        config.update((k, v) for k, v in overrides.items() if k in config)
+        configs[guild_id] = config
+    return configs
+
+guild_configs = load_guild_configs()
 
 # ================= 3. HELPER FUNCTIONS =================
+# --- Interaction handling ---
+# Discord fails an interaction that is not acknowledged within 3 seconds.
+# Handlers wrapped with @interaction_handler() defer first and answer through
+# reply(), which sends a followup once the interaction has been acknowledged.
+handler_latency = {}  # handler name -> deque of (ack_seconds, total_seconds)
+
+def mark_acked(interaction):
+    """Records when the interaction was first answered; later calls keep the first time."""
+    interaction.extras.setdefault("acked_at", discord.utils.utcnow())
+
+def interaction_handler(defer=True):
+    """
+    defer=False is for handlers that answer by themselves, with a modal or
+    a reply() that doesn't wait on Discord first; they are only timed, and
+    their ack counts from when reply() actually sent the answer.
+    Interactions from servers without a tournament are turned away before
+    the handler runs.
+    """
+    def decorator(func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(self, interaction, *args):
+            if LEAN_GATEWAY and isinstance(interaction.user, discord.Member):
+                member_cache.put(interaction.user)
+            if get_tournament(interaction.guild) is None:
+                await reply(interaction, "⚠️ Tournaments are not set up on this server.")
+                return
+            if defer and not interaction.response.is_done():
+                await interaction.response.defer(ephemeral=True, thinking=True)
+                mark_acked(interaction)
+            try:
+                await func(self, interaction, *args)
+            finally:
+                # A handler that opened a modal did so as its last step, so its end is the ack.
+                mark_acked(interaction)
+                # Measured from Discord's own timestamp, so gateway delay counts against the deadline too.
+                ack = (interaction.extras["acked_at"] - interaction.created_at).total_seconds()
+                total = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+                samples = handler_latency.setdefault(name, collections.deque(maxlen=LATENCY_SAMPLES))
+                samples.append((ack, total))
+        return wrapper
+    return decorator
+
+async def reply(interaction, content=None, **kwargs):
+    kwargs.setdefault("ephemeral", True)
+    if interaction.response.is_done():
+        await interaction.followup.send(content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
+        mark_acked(interaction)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+# --- Admin log ---
+# Registrations and verifications are queued in audit_log and posted as one
+# digest per log channel every AUDIT_FLUSH_INTERVAL, see audit.py.
+def audit_line(event):
+    t = tournaments.get(int(event["guild"]))
+    at = datetime.datetime.fromtimestamp(event["at"], t.tz if t else datetime.timezone.utc).strftime("%H:%M:%S")
+    if event["kind"] == "team_saved":
+        return f"`{at}` 🆕 **{event['team']}** saved by <@{event['uid']}>"
+    if event["kind"] == "team_verified":
+        players = ", ".join(f"<@{m}>" for m in event["members"])
+        return f"`{at}` 🛡️ **{event['team']}** verified by <@{event['by']}>: {players}"
+    return f"`{at}` {event['kind']}"
+
+async def send_audit_digest(channel, events):
+    # Discord limits: 4096 characters per description, and per message 10 embeds
+    # and 6000 characters of embed text (titles included), as counted by len(embed).
+    chunks, lines = [], []
+    for line in map(audit_line, events):
+        if lines and sum(len(l) + 1 for l in lines) + len(line) > 4000:
+            chunks.append(lines)
+            lines = []
+        lines.append(line)
+    chunks.append(lines)
+    title = f"🗒️ Admin Log · {len(events)} events"
+    embeds = [discord.Embed(title=title, description="\n".join(chunk), color=discord.Color.blue()) for chunk in chunks]
+
+    message, size = [], 0
+    for embed in embeds:
+        if message and (len(message) == 10 or size + len(embed) > 6000):
+            await channel.send(embeds=message)
+            message, size = [], 0
+        message.append(embed)
+        size += len(embed)
+    await channel.send(embeds=message)
+
+audit_log = audit.AuditLog(AUDIT_LOG_FILE, send_audit_digest, AUDIT_FLUSH_INTERVAL, AUDIT_BATCH_SIZE)
+
+# --- Roles & channels ---
+# guild.get_channel() is already a dict lookup; roles are only indexed by id,
+# so finding one by name means scanning guild.roles. RoleCache does that scan
+# once per name and is cleared by the role events at the end of section 9.
+class RoleCache:
+    """Role name -> Role (or None if the guild has no such role) for one guild."""
+    def __init__(self):
+        self.roles = {}
+        self.create_locks = {}
+
+    def get(self, guild, role_name):
+        if role_name not in self.roles:
+            self.roles[role_name] = discord.utils.get(guild.roles, name=role_name)
+        return self.roles[role_name]
+
+    def clear(self):
+        self.roles.clear()
+
+def get_role(guild, role_name):
+    return get_tournament(guild).roles.get(guild, role_name)
+
 async def get_or_create_role(guild, role_name):
-    role = discord.utils.get(guild.roles, name=role_name)
-    if not role:
-        try:
-            role = await guild.create_role(name=role_name, mentionable=True)
-        except: return None
+    cache = get_tournament(guild).roles
+    role = cache.get(guild, role_name)
+    if role: return role
+    # Two callers missing at once would otherwise both create the role.
+    lock = cache.create_locks.setdefault(role_name, asyncio.Lock())
+    async with lock:
+        role = cache.get(guild, role_name)
+        if not role:
+            try:
+                role = await guild.create_role(name=role_name, mentionable=True)
+            except: return None
+            cache.roles[role_name] = role
     return role
 
 async def setup_channel_perms(guild):
-    for slot_name, role_name in SLOT_ROLES.items():
+    """
+    Locks each match's list and room channel to its role. Only channels whose
+    overwrites differ from what they should be are edited, a few at a time.
+    Returns (edited, unchanged, failed) lists of channels.
+    """
+    t = get_tournament(guild)
+    desired = {}  # channel -> overwrites
+    for slot_name, role_name in t.slot_roles.items():
         role = await get_or_create_role(guild, role_name)
         if not role: continue
 
         channels_to_lock = []
-        if slot_name in SLOT_LIST_CHANNELS:
-            channels_to_lock.append(guild.get_channel(SLOT_LIST_CHANNELS[slot_name]))
-        if slot_name in ROOM_CHANNELS:
-            channels_to_lock.append(guild.get_channel(ROOM_CHANNELS[slot_name]))
+        if slot_name in t.slot_list_channels:
+            channels_to_lock.append(guild.get_channel(t.slot_list_channels[slot_name]))
+        if slot_name in t.room_channels:
+            channels_to_lock.append(guild.get_channel(t.room_channels[slot_name]))
         
         for ch in channels_to_lock:
             if ch:
-                overwrites = {
+                desired[ch] = {
                     guild.default_role: discord.PermissionOverwrite(view_channel=False),
                     role: discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True),
                     guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
                 }
-                await ch.edit(overwrites=overwrites)
-                print(f"🔒 Locked channel {ch.name} to role {role.name}")
 
-def check_duplicates(current_uid, new_team_name, new_players):
+    to_edit = [ch for ch, overwrites in desired.items() if ch.overwrites != overwrites]
+    unchanged = [ch for ch in desired if ch not in to_edit]
+    sem = asyncio.Semaphore(SETUP_EDIT_CONCURRENCY)
+
+    async def lock_channel(ch):
+        async with sem:
+            try:
+                await ch.edit(overwrites=desired[ch])
+            except discord.HTTPException as e:
+                print(f"⚠️ Could not lock channel {ch.name}: {e}")
+                return False
+        print(f"🔒 Locked channel {ch.name}")
+        return True
+
+    results = await asyncio.gather(*(lock_channel(ch) for ch in to_edit))
+    edited = [ch for ch, ok in zip(to_edit, results) if ok]
+    failed = [ch for ch, ok in zip(to_edit, results) if not ok]
+    return edited, unchanged, failed
+
+# --- Members ---
+# In lean gateway mode discord.py keeps no members, so guild.get_member()
+# misses for almost everyone. resolve_member() falls back to a small LRU of
+# members we have seen in interactions, then to fetching the member.
+def gateway_options(lean):
+    if not lean:
+        return {"intents": discord.Intents.all()}
+    intents = discord.Intents.none()
+    intents.guilds = True           # roles, channels and role events
+    intents.guild_messages = True   # prefix commands
+    intents.message_content = True
+    # No members/presences intents: member events (and so the verify role
+    # sync in on_member_update) only work in full mode.
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        "max_messages": None,
+    }
+
+class MemberCache:
+    """LRU of (guild id, member id) -> Member, holding at most `size` members."""
+    def __init__(self, size):
+        self.size = size
+        self.members = collections.OrderedDict()
+
+    def put(self, member):
+        key = (member.guild.id, member.id)
+        self.members[key] = member
+        self.members.move_to_end(key)
+        while len(self.members) > self.size:
+            self.members.popitem(last=False)
+
+    def get(self, guild_id, member_id):
+        member = self.members.get((guild_id, member_id))
+        if member is not None:
+            self.members.move_to_end((guild_id, member_id))
+        return member
+
+    def discard(self, guild_id, member_id):
+        # Members outside the gateway cache don't see our own role edits, drop them after one.
+        self.members.pop((guild_id, member_id), None)
+
+member_cache = MemberCache(MEMBER_CACHE_SIZE)
+
+async def resolve_member(guild, uid):
+    """The member from the gateway cache, the LRU or the API, or None if they left."""
+    member_id = int(uid)
+    member = guild.get_member(member_id) or member_cache.get(guild.id, member_id)
+    if member: return member
+    try:
+        member = await guild.fetch_member(member_id)
+    except discord.HTTPException:
+        return None
+    member_cache.put(member)
+    return member
+
+class NameIndex:
+    """
+    Reverse index of normalized team/player names to the uid that owns them,
+    kept in step with the guild's teams so duplicate checks are dict lookups.
+    """
+    def __init__(self):
+        self.team_names = {}
+        self.player_names = {}
+
+    def rebuild(self, teams):
+        self.team_names.clear()
+        self.player_names.clear()
+        for uid, info in teams.items():
+            self.add(uid, info)
+
+    def add(self, uid, info):
+        self.team_names[storage.normalize(info.get("team", ""))] = uid
+        for p in info.get("players", []):
+            if p.strip():
+                self.player_names[storage.normalize(p)] = uid
+
+    def remove(self, uid, info):
+        team_clean = storage.normalize(info.get("team", ""))
+        if self.team_names.get(team_clean) == uid:
+            del self.team_names[team_clean]
+        for p in info.get("players", []):
+            p_clean = storage.normalize(p)
+            if self.player_names.get(p_clean) == uid:
+                del self.player_names[p_clean]
+
+def team_timestamp(info):
+    """Unix time of the team's last update, or None. Older entries only carry the ISO string."""
+    if "updated_at" in info:
+        return info["updated_at"]
+    if info.get("last_updated"):
+        reg_time = datetime.datetime.fromisoformat(info["last_updated"])
+        return int(reg_time.replace(tzinfo=datetime.timezone.utc).timestamp())
+    return None
+
+class ExpiryIndex:
+    """
+    Min-heap of (expires_at, uid). Superseded heap entries are left in place
+    and skipped when popped; `expires` holds the live deadline per uid.
+    """
+    def __init__(self, ttl_seconds):
+        self.ttl = ttl_seconds
+        self.heap = []
+        self.expires = {}
+
+    def rebuild(self, teams):
+        self.expires = {}
+        for uid, info in teams.items():
+            ts = team_timestamp(info)
+            if ts is not None:
+                self.expires[uid] = ts + self.ttl
+        self.heap = [(exp, uid) for uid, exp in self.expires.items()]
+        heapq.heapify(self.heap)
+
+    def set(self, uid, ts):
+        if ts is None:
+            self.discard(uid)
+            return
+        self.expires[uid] = ts + self.ttl
+        heapq.heappush(self.heap, (ts + self.ttl, uid))
+
+    def discard(self, uid):
+        self.expires.pop(uid, None)
+
+    def is_expired(self, uid, now):
+        exp = self.expires.get(uid)
+        return exp is not None and now >= exp
+
+    def pop_expired(self, now):
+        expired = []
+        while self.heap and self.heap[0][0] <= now:
+            exp, uid = heapq.heappop(self.heap)
+            if self.expires.get(uid) == exp:
+                expired.append(uid)
+        return expired
+
+# --- Tournaments (one per guild) ---
+class Tournament:
+    """
+    One guild's tournament: its config, its partition of `data`, and the
+    indexes, locks and table renderer that only ever look at that partition.
+    """
+    def __init__(self, guild_id, config):
+        self.guild_id = guild_id
+        self.key = str(guild_id)
+        self.registration_open = REGISTRATION_OPEN
+        self.jobs_started = False
+        self.tables_restored = False
+        state = data["guilds"].setdefault(self.key, storage.new_partition())
+        self.teams = state["teams"]
+        self.slots = state["slots"]
+        self.waitlists = state.setdefault("waitlists", {})  # slot -> uids, first in line first
+        self.table_messages = state["table_messages"]
+        self.verified = state.setdefault("verified", {})  # member id -> {"team", "by", "at"}
+        self.verifying = set()  # member ids with a verification in flight
+        self.slot_locks = {}
+        self.pending_log = None  # records collected by batch()
+        self.roles = RoleCache()
+        self.name_index = NameIndex()
+        self.name_index.rebuild(self.teams)
+        self.apply_config(config)
+        self.renderer = TableRenderer(self, TABLE_REFRESH_INTERVAL)
+        self.availability = Availability(self)
+
+    def apply_config(self, config):
+        self.config = config
+        for key in default_guild_config():
+            setattr(self, key, config[key])
+        self.tz = datetime.timezone(datetime.timedelta(hours=self.timezone_offset))
+        for slot_name in self.slot_list_channels:
+            self.slots.setdefault(slot_name, [])
+        self.expiry_index = ExpiryIndex(self.data_expiry_days * 86400)
+        self.expiry_index.rebuild(self.teams)
+
+    def log(self, op, **fields):
+        if self.pending_log is not None:
+            self.pending_log.append({"op": op, **fields})
+        else:
+            log_change(op, guild=self.key, **fields)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collects every change logged inside into one journal record. Don't
+        await inside it, or another coroutine's changes end up in the batch.
+        """
+        self.pending_log = []
+        try:
+            yield
+        finally:
+            records, self.pending_log = self.pending_log, None
+            if len(records) == 1:
+                self.log(**records[0])
+            elif records:
+                self.log("batch", records=records)
+
+    def job_name(self, name):
+        return f"{self.key}:{name}"
+
+tournaments = {}  # guild id -> Tournament
+
+def is_home_guild(guild):
+    """The server the constants in section 1 were written for owns the admin channel."""
+    return guild.get_channel(ADMIN_COMMAND_CHANNEL_ID) is not None
+
+def get_tournament(guild):
+    """The tournament run in this guild, or None if the guild is not configured."""
+    if guild is None: return None
+    t = tournaments.get(guild.id)
+    if t: return t
+
+    key = str(guild.id)
+    home = is_home_guild(guild)
+    config = guild_configs.get(key)
+    if config is None:
+        if not home: return None
+        config = default_guild_config()
+    if home and storage.LEGACY_GUILD in data["guilds"] and key not in data["guilds"]:
+        adopt_legacy_data(key)
+    t = tournaments[guild.id] = Tournament(guild.id, config)
+    return t
+
+def adopt_legacy_data(key):
+    """Moves data saved before guild partitioning (and its scheduled jobs) to the home guild."""
+    data["guilds"][key] = data["guilds"].pop(storage.LEGACY_GUILD)
+    log_change("guild_adopt", guild=key, **{"from": storage.LEGACY_GUILD})
+    for name, job in list(data["schedule"]["jobs"].items()):
+        if "guild" in job: continue
+        del data["schedule"]["jobs"][name]
+        log_change("job_remove", name=name)
+        job = {**job, "guild": key}
+        data["schedule"]["jobs"][f"{key}:{name}"] = job
+        log_change("job_set", name=f"{key}:{name}", job=job)
+    print(f"📦 Adopted pre-partitioning data for guild {key}")
+
+def upsert_team(t, uid, info):
+    old = t.teams.get(uid)
+    if old:
+        t.name_index.remove(uid, old)
+    t.teams[uid] = info
+    t.name_index.add(uid, info)
+    t.expiry_index.set(uid, team_timestamp(info))
+    t.log("team_upsert", uid=uid, team=info)
+
+def delete_team(t, uid):
+    info = t.teams.pop(uid, None)
+    t.expiry_index.discard(uid)
+    for slot_name in list(t.waitlists):
+        leave_waitlist(t, uid, slot_name)
+    if info:
+        t.name_index.remove(uid, info)
+        t.log("team_delete", uid=uid)
+
+@metrics.timed("slotbot_duplicate_check", "Team and player name duplicate checks")
+def check_duplicates(t, current_uid, new_team_name, new_players):
     """
     Checks if team name or player names already exist in database (Registration).
     """
-    new_team_clean = new_team_name.strip().lower()
-    new_players_clean = [p.strip().lower() for p in new_players if p.strip()]
+    new_team_clean = storage.normalize(new_team_name)
+    new_players_clean = [storage.normalize(p) for p in new_players if p.strip()]
 
     # 1. Check for duplicates within the current submission
     if len(new_players_clean) != len(set(new_players_clean)):
         return True, "❌ You entered the same player name twice in this form."
 
-    for uid, info in data["teams"].items():
-        if uid == current_uid:
-            continue
+    owner = t.name_index.team_names.get(new_team_clean)
+    if owner is not None and owner != current_uid:
+        return True, f"❌ Team Name **'{new_team_name}'** is already taken by another squad!"
 
-        existing_team = info.get("team", "").strip().lower()
-        if existing_team == new_team_clean:
-            return True, f"❌ Team Name **'{new_team_name}'** is already taken by another squad!"
-
-        existing_players = [p.strip().lower() for p in info.get("players", [])]
-        for np in new_players_clean:
-            if np in existing_players:
-                return True, f"❌ Player Name **'{np}'** is already registered in another team!"
+    for np in new_players_clean:
+        owner = t.name_index.player_names.get(np)
+        if owner is not None and owner != current_uid:
+            owner_team = t.teams.get(owner, {}).get("team", "another team")
+            return True, f"❌ Player Name **'{np}'** is already registered in **{owner_team}**!"
 
     return False, ""
 
 # ================= 4. LIVE TABLE REFRESH =================
-async def refresh_table(guild, slot_name):
-    channel_id = SLOT_LIST_CHANNELS.get(slot_name)
-    if not channel_id: return
-    channel = guild.get_channel(channel_id)
-    if not channel: return
-
-    registered_uids = data["slots"].get(slot_name, [])
+def build_table_embed(t, slot_name):
+    registered_uids = t.slots.get(slot_name, [])
     table_lines = [f"{'NO.':<3} | {'TEAM NAME'}", "-" * 30]
     
-    for i in range(MAX_SLOTS):
+    for i in range(t.max_slots):
         slot_num = i + 1
         if i < len(registered_uids):
             uid = registered_uids[i]
-            team_name = data["teams"].get(uid, {}).get("team", "Unknown")
+            team_name = t.teams.get(uid, {}).get("team", "Unknown")
             team_name = (team_name[:18] + '..') if len(team_name) > 18 else team_name
             table_lines.append(f"{slot_num:02d}  | {team_name}")
         else:
@@ -158,88 +642,585 @@ async def refresh_table(guild, slot_name):
     tabular_data = "\n".join(table_lines)
     display_name = slot_name.replace("_", " ")
     count = len(registered_uids)
-    color = discord.Color.green() if count < MAX_SLOTS else discord.Color.red()
-    status = "🟢 Open" if count < MAX_SLOTS else "🔴 Full"
+    color = discord.Color.green() if count < t.max_slots else discord.Color.red()
+    status = "🟢 Open" if count < t.max_slots else "🔴 Full"
 
     embed = discord.Embed(
         title=f"🏆 {display_name} Live List",
-        description=f"**Status:** {status}\n**Filled:** {count}/{MAX_SLOTS}",
+        description=f"**Status:** {status}\n**Filled:** {count}/{t.max_slots}",
         color=color
     )
     embed.add_field(name="Registered Teams", value=f"```text\n{tabular_data}\n```", inline=False)
     embed.set_footer(text="Updates automatically • Do not type here")
+    return embed
 
-    msg_id = data["table_messages"].get(slot_name)
-    message = None
-    if msg_id:
-        try:
-            message = await channel.fetch_message(msg_id)
-            await message.edit(embed=embed)
-        except discord.NotFound:
-            message = None 
-    
-    if message is None:
-        message = await channel.send(embed=embed)
-        data["table_messages"][slot_name] = message.id
-        save_data(data)
+def embed_signature(embed):
+    """What a table shows, comparable between an embed built here and one fetched from Discord."""
+    color = embed.color.value if embed.color else None
+    return (embed.title, embed.description, color, [(f.name, f.value) for f in embed.fields], embed.footer.text)
 
-# ================= 5. CORE LOGIC (SLOTS ADD/REMOVE) =================
-async def add_player_to_slot(interaction, slot_name):
-    uid = str(interaction.user.id)
-    guild = interaction.guild
-    
-    if not REGISTRATION_OPEN:
-        await interaction.response.send_message("⛔ **Match is starting! Registration is closed.**", ephemeral=True)
-        return False
-        
-    if len(data["slots"][slot_name]) >= MAX_SLOTS:
-        return False
+class TableRenderer:
+    """
+    One background task per match table. Changes only mark the table dirty;
+    the task folds every change made during TABLE_REFRESH_INTERVAL into a
+    single edit, and skips the edit when the embed did not change at all.
+    """
+    def __init__(self, tournament, interval):
+        self.t = tournament
+        self.interval = interval
+        self.guilds = {}
+        self.events = {}
+        self.tasks = {}
+        self.messages = {}   # slot -> cached PartialMessage
+        self.last_sent = {}  # slot -> serialized embed last pushed to Discord
+        self.failing = set()  # slots whose last refresh was refused, already logged
+        self.locks = {}
+
+    def mark_dirty(self, guild, slot_name):
+        self.guilds[slot_name] = guild
+        if slot_name not in self.events:
+            self.events[slot_name] = asyncio.Event()
+        self.events[slot_name].set()
+        task = self.tasks.get(slot_name)
+        if task is None or task.done():
+            self.tasks[slot_name] = asyncio.create_task(self._run(slot_name))
+
+    async def _run(self, slot_name):
+        event = self.events[slot_name]
+        backoff = self.interval
+        while True:
+            await event.wait()
+            event.clear()
+            try:
+                await self.render(self.guilds[slot_name], slot_name)
+                backoff = self.interval
+                self.failing.discard(slot_name)
+            except discord.HTTPException as e:
+                if e.status >= 500:
+                    # Discord-side trouble: retry, waiting longer each time.
+                    print(f"⚠️ Table refresh for {slot_name} failed, retrying in {backoff:.1f}s: {e}")
+                    event.set()
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, TABLE_RETRY_MAX)
+                    continue
+                # Missing permissions and the like won't fix themselves; wait for the next change.
+                if slot_name not in self.failing:
+                    print(f"⚠️ Table refresh for {slot_name} failed: {e}")
+                    self.failing.add(slot_name)
+            await asyncio.sleep(self.interval)
+
+    @metrics.timed("slotbot_table_refresh", "Live table renders, including the Discord edit")
+    async def render(self, guild, slot_name, force=False):
+        lock = self.locks.setdefault(slot_name, asyncio.Lock())
+        async with lock:
+            await self._render(guild, slot_name, force)
+
+    async def _render(self, guild, slot_name, force):
+        t = self.t
+        channel_id = t.slot_list_channels.get(slot_name)
+        if not channel_id: return
+        channel = guild.get_channel(channel_id)
+        if not channel: return
+
+        embed = build_table_embed(t, slot_name)
+        rendered = json.dumps(embed.to_dict(), sort_keys=True)
+        msg_id = t.table_messages.get(slot_name)
+        if not force and msg_id and rendered == self.last_sent.get(slot_name):
+            return
 
-    if uid in data["slots"][slot_name]:
-        await interaction.response.send_message(f"⚠️ You are already in **{slot_name}**.", ephemeral=True)
+        if msg_id:
+            message = self.messages.get(slot_name)
+            if message is None or message.id != msg_id:
+                message = channel.get_partial_message(msg_id)
+                self.messages[slot_name] = message
+            try:
+                await message.edit(embed=embed)
+                self.last_sent[slot_name] = rendered
+                return
+            except discord.NotFound:
+                self.messages.pop(slot_name, None)
+
+        message = await channel.send(embed=embed)
+        self.messages[slot_name] = channel.get_partial_message(message.id)
+        self.last_sent[slot_name] = rendered
+        t.table_messages[slot_name] = message.id
+        t.log("table_message", slot=slot_name, message_id=message.id)
+
+    async def restore(self, guild):
+        """
+        After a restart, fetches every stored table message at once. Tables
+        that still show the current state are only cached; missing or stale
+        ones are queued for a normal render. Returns (current, re-rendered).
+        """
+        results = await asyncio.gather(*(self._validate(guild, s) for s in self.t.slot_list_channels))
+        return results.count(True), results.count(False)
+
+    async def _validate(self, guild, slot_name):
+        t = self.t
+        msg_id = t.table_messages.get(slot_name)
+        channel = guild.get_channel(t.slot_list_channels[slot_name])
+        if msg_id and channel:
+            embed = build_table_embed(t, slot_name)
+            message = channel.get_partial_message(msg_id)
+            try:
+                current = await message.fetch()
+            except discord.HTTPException:
+                current = None  # deleted or unreadable, the render posts a new one
+            if current and current.embeds and embed_signature(current.embeds[0]) == embed_signature(embed):
+                self.messages[slot_name] = message
+                self.last_sent[slot_name] = json.dumps(embed.to_dict(), sort_keys=True)
+                return True
+        self.mark_dirty(guild, slot_name)
         return False
 
-    data["slots"][slot_name].append(uid)
-    if "booked_slots" not in data["teams"][uid]:
-        data["teams"][uid]["booked_slots"] = []
-    
-    if slot_name not in data["teams"][uid]["booked_slots"]:
-        data["teams"][uid]["booked_slots"].append(slot_name)
-    save_data(data)
+table_refresh_requests = metrics.Counter(
+    "slotbot_table_refresh_requests_total", "Table refreshes asked for, before coalescing", ("guild",)
+)
 
-    role_name = SLOT_ROLES.get(slot_name)
-    if role_name:
-        role = await get_or_create_role(guild, role_name)
-        if role:
-            try: await interaction.user.add_roles(role)
-            except: pass
+def refresh_table(guild, slot_name):
+    if metrics.enabled:
+        table_refresh_requests.inc(str(guild.id))
+    get_tournament(guild).renderer.mark_dirty(guild, slot_name)
+
+# ================= 5. CORE LOGIC (SLOTS ADD/REMOVE) =================
+# Bookings are committed under the match's lock in one synchronous step, so
+# t.slots and booked_slots always change together. Role changes and the
+# table refresh run afterwards in the background.
+role_locks = {}  # (guild id, uid) -> [lock, tasks holding or waiting for it]
+background_tasks = set()
+
+@contextlib.asynccontextmanager
+async def member_role_lock(guild, uid):
+    """
+    Serializes role changes for one member. The entry is only dropped once
+    nobody holds or waits for it; a woken waiter has not taken the lock yet,
+    so lock.locked() alone can't tell.
+    """
+    key = (guild.id, uid)
+    entry = role_locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del role_locks[key]
+
+def slot_lock(t, slot_name):
+    if slot_name not in t.slot_locks:
+        t.slot_locks[slot_name] = asyncio.Lock()
+    return t.slot_locks[slot_name]
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+class Availability:
+    """
+    Fill count per match, kept up to date by commit_claim/commit_release, and
+    a version that moves with every change. SlotSelectViews built at the same
+    version share one set of button labels, and a click on a view from an
+    older version is checked against the live counts before anything else.
+    """
+    def __init__(self, t):
+        self.t = t
+        self.version = 0
+        self.rebuild()
+
+    def rebuild(self):
+        self.counts = {s: len(self.t.slots.get(s, [])) for s in self.t.slot_list_channels}
+        self.version += 1
+        self.buttons = None
+
+    def change(self, slot_name, delta):
+        self.counts[slot_name] = self.counts.get(slot_name, 0) + delta
+        self.version += 1
+        self.buttons = None
+
+    def is_full(self, slot_name):
+        return self.counts.get(slot_name, 0) >= self.t.max_slots
+
+    def button_specs(self):
+        """(slot, label, style, disabled) per match, worked out once per version."""
+        if self.buttons is None:
+            max_slots = self.t.max_slots
+            self.buttons = []
+            for slot in self.t.slot_list_channels:
+                count = self.counts.get(slot, 0)
+                display_name = slot.replace("_", " ")
+                label = f"{display_name} ({count}/{max_slots})"
+                if count < max_slots:
+                    self.buttons.append((slot, label, discord.ButtonStyle.green, False))
+                else:
+                    # Full matches stay clickable, a click joins the waitlist.
+                    self.buttons.append((slot, f"{display_name} (Full · Waitlist)", discord.ButtonStyle.red, False))
+        return self.buttons
+
+def book_slot(t, uid, slot_name):
+    t.slots[slot_name].append(uid)
+    t.availability.change(slot_name, 1)
+    booked = t.teams[uid].setdefault("booked_slots", [])
+    if slot_name not in booked:
+        booked.append(slot_name)
+
+def commit_claim(t, uid, slot_name):
+    book_slot(t, uid, slot_name)
+    t.log("claim", slot=slot_name, uid=uid)
+
+def commit_promote(t, uid, slot_name):
+    t.waitlists[slot_name].remove(uid)
+    book_slot(t, uid, slot_name)
+    t.log("promote", slot=slot_name, uid=uid)
+
+def commit_release(t, uid, slot_name):
+    if uid in t.slots[slot_name]:
+        t.slots[slot_name].remove(uid)
+        t.availability.change(slot_name, -1)
+    if uid in t.teams and slot_name in t.teams[uid].get("booked_slots", []):
+        t.teams[uid]["booked_slots"].remove(slot_name)
+    t.log("release", slot=slot_name, uid=uid)
+
+# --- Waitlists ---
+# A team that finds a match full joins that match's waitlist instead of
+# retrying. When perform_removal frees a spot, the first team in line is
+# booked into it right away and gets the role, the table update and a DM.
+def waiting_for(t, uid):
+    """The match this team is queued for, or None. A team waits for one match at a time."""
+    for slot_name, queue in t.waitlists.items():
+        if uid in queue:
+            return slot_name
+    return None
+
+def join_waitlist(t, uid, slot_name):
+    if uid in t.slots[slot_name]:
+        return False, f"⚠️ You are already in **{slot_name}**."
+    current = waiting_for(t, uid)
+    if current:
+        position = t.waitlists[current].index(uid) + 1
+        return False, f"⏳ You are already #{position} on the **{current.replace('_', ' ')}** waitlist."
+    queue = t.waitlists.setdefault(slot_name, [])
+    queue.append(uid)
+    t.log("waitlist_join", slot=slot_name, uid=uid)
+    return False, (
+        f"⏳ **{slot_name.replace('_', ' ')}** is full. You are #{len(queue)} on its waitlist "
+        "and will get a DM if a spot opens."
+    )
 
-    await refresh_table(guild, slot_name)
+def leave_waitlist(t, uid, slot_name):
+    queue = t.waitlists.get(slot_name, [])
+    if uid not in queue:
+        return False
+    queue.remove(uid)
+    t.log("waitlist_leave", slot=slot_name, uid=uid)
     return True
 
-async def perform_removal(guild, uid, slot_name):
-    if uid in data["slots"][slot_name]:
-        data["slots"][slot_name].remove(uid)
-    
-    if uid in data["teams"] and slot_name in data["teams"][uid]["booked_slots"]:
-        data["teams"][uid]["booked_slots"].remove(slot_name)
+def promote_next(t, slot_name):
+    """Books the first eligible team in line into a free spot. Call under the match lock."""
+    queue = t.waitlists.get(slot_name, [])
+    while queue and len(t.slots[slot_name]) < t.max_slots:
+        uid = queue[0]
+        if uid in t.teams and uid not in t.slots[slot_name]:
+            commit_promote(t, uid, slot_name)
+            return uid
+        leave_waitlist(t, uid, slot_name)
+    return None
+
+async def notify_promoted(guild, uid, slot_name):
+    t = get_tournament(guild)
+    member = await resolve_member(guild, uid)
+    if not member: return
+    team_name = t.teams.get(uid, {}).get("team", "Your team")
+    try:
+        await member.send(
+            f"🎉 A spot opened in **{slot_name.replace('_', ' ')}** on **{guild.name}**!\n"
+            f"**{team_name}** was moved off the waitlist and is now in the match."
+        )
+    except discord.HTTPException:
+        pass  # DMs closed; the role and the live table still show it
+
+# --- Bulk import / export ---
+# !import_teams reads rows of (discord_id, team, players, matches) from a CSV
+# or JSON attachment, checks every row with the same rules as registration,
+# and applies the whole file as one change: one journal record, one table
+# refresh per match and role grants running side by side afterwards.
+IMPORT_CSV_FIELDS = ["discord_id", "team", "player1", "player2", "player3", "player4", "matches"]
+
+def json_import_row(row):
+    """(uid, team, players, matches) from one JSON team, or a ValueError saying which field is wrong."""
+    if not isinstance(row, dict):
+        raise ValueError("each team must be an object.")
+    uid, team, players, matches = row.get("discord_id", ""), row.get("team", ""), row.get("players", []), row.get("matches", [])
+    if isinstance(uid, bool) or not isinstance(uid, (str, int)):
+        raise ValueError("`discord_id` must be a string or a number.")
+    if not isinstance(team, str):
+        raise ValueError("`team` must be a string.")
+    if not isinstance(players, list) or not all(isinstance(p, str) for p in players):
+        raise ValueError("`players` must be a list of names.")
+    if not isinstance(matches, list) or not all(isinstance(m, str) for m in matches):
+        raise ValueError("`matches` must be a list of match names.")
+    matches = [m.strip().upper() for m in matches if m.strip()]
+    return str(uid).strip(), team.strip(), [p.strip() for p in players], matches
+
+def read_import_rows(filename, raw):
+    """
+    Yields (line, uid, team, players, matches, problem) per row, without
+    loading the CSV into a list. `problem` is set, and the other fields
+    empty, when a JSON row has the wrong types.
+    """
+    text = raw.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        doc = json.loads(text)
+        rows = doc.get("teams") if isinstance(doc, dict) else doc
+        if not isinstance(rows, list):
+            raise ValueError("expected a list of teams, or an object with a `teams` list.")
+        for line, row in enumerate(rows, 1):
+            try:
+                uid, team, players, matches = json_import_row(row)
+            except ValueError as e:
+                yield line, "", "", [], [], str(e)
+                continue
+            yield line, uid, team, players, matches, None
+        return
+    for line, row in enumerate(csv.DictReader(io.StringIO(text)), 2):
+        players = [(row.get(f"player{n}") or "").strip() for n in range(1, 5)]
+        matches = [m.strip().upper() for m in (row.get("matches") or "").split(";") if m.strip()]
+        yield line, (row.get("discord_id") or "").strip(), (row.get("team") or "").strip(), players, matches, None
+
+class ImportBatch:
+    """
+    Rows validated so far. It carries its own name index and team table
+    (existing teams plus earlier rows), so check_duplicates sees the file and
+    the live data together.
+    """
+    def __init__(self, t):
+        self.t = t
+        self.name_index = NameIndex()
+        self.name_index.team_names = dict(t.name_index.team_names)
+        self.name_index.player_names = dict(t.name_index.player_names)
+        self.teams = dict(t.teams)
+        self.counts = {s: len(t.slots.get(s, [])) for s in t.slot_list_channels}
+        self.rows = {}    # uid -> (team info, matches)
+        self.errors = []
+
+    def add(self, line, uid, team_name, players, matches, problem=None):
+        if problem:
+            return self.errors.append(f"Line {line}: {problem}")
+        players = [p for p in players if p]
+        if not uid.isdigit():
+            return self.errors.append(f"Line {line}: `{uid}` is not a Discord user id.")
+        if uid in self.rows:
+            return self.errors.append(f"Line {line}: <@{uid}> appears twice in the file.")
+        if not team_name or not players:
+            return self.errors.append(f"Line {line}: a team name and at least one player are required.")
+        is_duplicate, error_msg = check_duplicates(self, uid, team_name, players)
+        if is_duplicate:
+            return self.errors.append(f"Line {line}: {error_msg}")
+        for slot_name in matches:
+            if slot_name not in self.counts:
+                return self.errors.append(f"Line {line}: unknown match `{slot_name}`.")
+        new_matches = [s for s in dict.fromkeys(matches) if uid not in self.t.slots.get(s, [])]
+        for slot_name in new_matches:
+            if self.counts[slot_name] + 1 > self.t.max_slots:
+                return self.errors.append(f"Line {line}: **{slot_name}** would have more than {self.t.max_slots} teams.")
+
+        now = datetime.datetime.utcnow()
+        old = self.teams.get(uid)
+        info = {
+            "team": team_name,
+            "players": players,
+            "booked_slots": list(old.get("booked_slots", [])) if old else [],
+            "last_updated": now.isoformat(),
+            "updated_at": int(now.replace(tzinfo=datetime.timezone.utc).timestamp())
+        }
+        if old:
+            self.name_index.remove(uid, old)
+        self.name_index.add(uid, info)
+        self.teams[uid] = info
+        for slot_name in new_matches:
+            self.counts[slot_name] += 1
+        self.rows[uid] = (info, new_matches)
+
+async def apply_import(t, batch):
+    """
+    Commits a validated batch under the locks of every match it touches and
+    writes it as a single journal record. Returns the (uid, slot) bookings made.
+    """
+    touched = sorted({s for _, matches in batch.rows.values() for s in matches})
+    async with contextlib.AsyncExitStack() as stack:
+        for slot_name in touched:
+            await stack.enter_async_context(slot_lock(t, slot_name))
+        # Claims may have landed while the file was being read.
+        for slot_name in touched:
+            wanted = sum(slot_name in matches and uid not in t.slots[slot_name] for uid, (_, matches) in batch.rows.items())
+            if len(t.slots[slot_name]) + wanted > t.max_slots:
+                return None
+
+        claims = []
+        for uid, (info, matches) in batch.rows.items():
+            old = t.teams.get(uid)
+            if old:
+                t.name_index.remove(uid, old)
+            t.teams[uid] = info
+            t.name_index.add(uid, info)
+            t.expiry_index.set(uid, team_timestamp(info))
+            for slot_name in matches:
+                if uid in t.slots[slot_name]: continue
+                if uid in t.waitlists.get(slot_name, []):
+                    t.waitlists[slot_name].remove(uid)
+                book_slot(t, uid, slot_name)
+                claims.append((slot_name, uid))
+        t.log("import", teams={uid: info for uid, (info, _) in batch.rows.items()}, claims=claims)
+    return claims
+
+async def grant_imported_roles(guild, claims):
+    sem = asyncio.Semaphore(BULK_ROLE_CONCURRENCY)
+
+    async def grant(uid, slot_name):
+        async with sem:
+            await sync_slot_role(guild, uid, slot_name)
+
+    await asyncio.gather(*(grant(uid, slot_name) for slot_name, uid in claims))
+
+def export_team_data(t, fmt):
+    """The tournament's teams and bookings in the same shape !import_teams reads."""
+    rows = []
+    for uid, info in t.teams.items():
+        rows.append({"discord_id": uid, "team": info.get("team", ""), "players": list(info.get("players", [])),
+                     "matches": list(info.get("booked_slots", []))})
+    if fmt == "json":
+        return json.dumps({"teams": rows, "slots": t.slots}, indent=2)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(IMPORT_CSV_FIELDS)
+    for row in rows:
+        players = (row["players"] + [""] * 4)[:4]
+        writer.writerow([row["discord_id"], row["team"], *players, ";".join(row["matches"])])
+    return out.getvalue()
+
+async def sync_slot_role(guild, uid, slot_name):
+    """
+    Gives or takes the match role so it matches the booking as it stands now.
+    Runs per member under a lock, so a quick claim+release can't land out of order.
+    """
+    t = get_tournament(guild)
+    role_name = t.slot_roles.get(slot_name)
+    if not role_name: return
+    async with member_role_lock(guild, uid):
+        booked = uid in t.slots.get(slot_name, [])
+        member = await resolve_member(guild, uid)
+        if not member: return
+        if booked:
+            role = await get_or_create_role(guild, role_name)
+            if role and role not in member.roles:
+                try: await member.add_roles(role)
+                except: pass
+        else:
+            role = get_role(guild, role_name)
+            if role and role in member.roles:
+                try: await member.remove_roles(role)
+                except: pass
+        member_cache.discard(guild.id, member.id)
+
+@metrics.timed("slotbot_claim", "Match claims")
+async def add_player_to_slot(interaction, slot_name):
+    uid = str(interaction.user.id)
+    guild = interaction.guild
+    t = get_tournament(guild)
     
-    save_data(data)
+    if not t.registration_open:
+        return False, "⛔ **Match is starting! Registration is closed.**"
+
+    if uid not in t.teams:
+        return False, "❌ Register first."
+
+    async with slot_lock(t, slot_name):
+        if uid in t.slots[slot_name]:
+            return False, f"⚠️ You are already in **{slot_name}**."
+        if len(t.slots[slot_name]) >= t.max_slots:
+            return join_waitlist(t, uid, slot_name)
+        if uid in t.waitlists.get(slot_name, []):
+            commit_promote(t, uid, slot_name)
+        else:
+            commit_claim(t, uid, slot_name)
 
-    role_name = SLOT_ROLES.get(slot_name)
-    if role_name:
-        role = discord.utils.get(guild.roles, name=role_name)
-        member = guild.get_member(int(uid))
-        if role and member:
-            try: await member.remove_roles(role)
-            except: pass
+    run_in_background(sync_slot_role(guild, uid, slot_name))
+    refresh_table(guild, slot_name)
+    return True, f"✅ Claimed **{slot_name}**."
 
-    await refresh_table(guild, slot_name)
+async def strip_slot_roles(guild, uid, slot_names):
+    """
+    Takes every given match role the team no longer holds a booking for, in
+    one remove_roles() call under one hold of the member's lock. discord.py
+    still sends one DELETE per role: atomic=False would make it a single
+    PATCH of the whole role list, but that list comes from our cache and
+    could undo a role someone else just gave the member.
+    """
+    t = get_tournament(guild)
+    async with member_role_lock(guild, uid):
+        member = await resolve_member(guild, uid)
+        if not member: return
+        roles = []
+        for slot_name in slot_names:
+            role_name = t.slot_roles.get(slot_name)
+            if not role_name or uid in t.slots.get(slot_name, []): continue
+            role = get_role(guild, role_name)
+            if role and role in member.roles:
+                roles.append(role)
+        if roles:
+            try: await member.remove_roles(*roles)
+            except discord.HTTPException: pass
+        member_cache.discard(guild.id, member.id)
+
+@metrics.timed("slotbot_release", "Match releases")
+async def release_bookings(guild, bookings):
+    """
+    Releases (uid, match) bookings as one change: all matches involved are
+    locked together and the releases and waitlist promotions are written as
+    one journal record. Each team's match roles are taken in one background
+    task (see strip_slot_roles), and each table is refreshed once. Returns
+    what was released.
+    """
+    t = get_tournament(guild)
+    touched = sorted({slot_name for _, slot_name in bookings})
+    released, promoted = [], []
+    async with contextlib.AsyncExitStack() as stack:
+        for slot_name in touched:
+            await stack.enter_async_context(slot_lock(t, slot_name))
+        with t.batch():
+            for uid, slot_name in dict.fromkeys(bookings):
+                if uid not in t.slots.get(slot_name, []): continue
+                commit_release(t, uid, slot_name)
+                released.append((uid, slot_name))
+            if t.registration_open:
+                for slot_name in touched:
+                    while True:
+                        uid = promote_next(t, slot_name)
+                        if not uid: break
+                        promoted.append((uid, slot_name))
+
+    by_team = {}
+    for uid, slot_name in released:
+        by_team.setdefault(uid, []).append(slot_name)
+    for uid, slot_names in by_team.items():
+        run_in_background(strip_slot_roles(guild, uid, slot_names))
+    for uid, slot_name in promoted:
+        run_in_background(sync_slot_role(guild, uid, slot_name))
+        run_in_background(notify_promoted(guild, uid, slot_name))
+    for slot_name in {slot_name for _, slot_name in released + promoted}:
+        refresh_table(guild, slot_name)
+    return released
+
+async def perform_removal(guild, uid, slot_name):
+    await release_bookings(guild, [(uid, slot_name)])
 
 async def remove_single_slot_logic(interaction, slot_to_remove):
     uid = str(interaction.user.id)
-    if uid not in data["teams"]: return False, "No team data."
-    booked = data["teams"][uid].get("booked_slots", [])
+    t = get_tournament(interaction.guild)
+    if uid not in t.teams: return False, "No team data."
+    booked = t.teams[uid].get("booked_slots", [])
     
     if slot_to_remove not in booked:
         return False, "You don't own this slot."
@@ -249,118 +1230,300 @@ async def remove_single_slot_logic(interaction, slot_to_remove):
 
 async def remove_all_slots_logic(interaction):
     uid = str(interaction.user.id)
-    if uid not in data["teams"] or not data["teams"][uid].get("booked_slots"):
+    t = get_tournament(interaction.guild)
+    waiting = waiting_for(t, uid)
+    if uid not in t.teams or not (t.teams[uid].get("booked_slots") or waiting):
         return False, "You have no slots to cancel."
 
-    booked = list(data["teams"][uid]["booked_slots"])
-    for s in booked:
-        await perform_removal(interaction.guild, uid, s)
+    if waiting:
+        leave_waitlist(t, uid, waiting)
+    booked = t.teams[uid]["booked_slots"]
+    await release_bookings(interaction.guild, [(uid, s) for s in booked])
     return True, "✅ All matches cancelled."
 
-# ================= 6. AUTO-RESET TASK =================
-@tasks.loop(minutes=1)
-async def daily_reset_task():
-    utc_now = datetime.datetime.utcnow()
-    local_now = utc_now + datetime.timedelta(hours=TIMEZONE_OFFSET)
-    
-    if local_now.hour == 0 and local_now.minute == 0:
-        print("🕛 MIDNIGHT RESET: Cleaning up...")
-        if not bot.guilds: return
-        guild = bot.guilds[0]
-
-        for slot_name, uids in data["slots"].items():
-            role_name = SLOT_ROLES.get(slot_name)
-            role = discord.utils.get(guild.roles, name=role_name)
-            if role:
-                for uid in uids:
-                    member = guild.get_member(int(uid))
-                    if member:
-                        try: await member.remove_roles(role)
-                        except: pass
-            data["slots"][slot_name] = [] 
-
-        for uid in data["teams"]:
-            data["teams"][uid]["booked_slots"] = []
-
-        uids_to_delete = []
-        for uid, info in data["teams"].items():
-            reg_time_str = info.get("last_updated", utc_now.isoformat()) 
-            reg_time = datetime.datetime.fromisoformat(reg_time_str)
-            if (utc_now - reg_time).days >= DATA_EXPIRY_DAYS:
-                uids_to_delete.append(uid)
-        
-        for uid in uids_to_delete:
-            del data["teams"][uid]
-            print(f"🗑️ Deleted expired data for User ID: {uid}")
+# ================= 6. SCHEDULER & AUTO-RESET =================
+class Scheduler:
+    """
+    Runs daily jobs at a local HH:MM (each job has its guild's timezone).
+    It sleeps until the next job is due instead of polling, and stores each
+    job's last completed run in data["schedule"]. A run that was missed (bot
+    offline, reconnecting) is caught up on startup if it is no older than
+    the job's grace period.
+    """
+    def __init__(self):
+        self.jobs = {}  # name -> (hour, minute, grace_seconds, func, tz)
+        self.wake = asyncio.Event()
+        self.task = None
+        self.running = None  # name of the job running right now
+
+    def add_daily(self, name, hour, minute, func, grace=0, tz=datetime.timezone.utc):
+        # A little grace is always needed, the loop can wake a moment late.
+        self.jobs[name] = (hour, minute, max(grace, 60), func, tz)
+        if name not in data["schedule"]["last_run"]:
+            # A brand-new job starts counting from now rather than catching up on the past.
+            at = datetime.datetime.now(tz).isoformat()
+            data["schedule"]["last_run"][name] = at
+            log_change("job_run", name=name, at=at)
+        self.wake.set()
+
+    def remove(self, name):
+        self.jobs.pop(name, None)
+        self.wake.set()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def last_fire(self, name):
+        hour, minute, _, _, tz = self.jobs[name]
+        now = datetime.datetime.now(tz)
+        fire = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if fire > now:
+            fire -= datetime.timedelta(days=1)
+        return fire
+
+    def next_fire(self, name):
+        return self.last_fire(name) + datetime.timedelta(days=1)
+
+    def is_due(self, name):
+        fire = self.last_fire(name)
+        last_run = data["schedule"]["last_run"].get(name)
+        if last_run and datetime.datetime.fromisoformat(last_run) >= fire:
+            return False
+        return (datetime.datetime.now(datetime.timezone.utc) - fire).total_seconds() <= self.jobs[name][2]
 
-        save_data(data)
+    async def _run(self):
+        while True:
+            for name in list(self.jobs):
+                if name in self.jobs and self.is_due(name):
+                    await self._run_job(name)
 
-        for slot_name in SLOT_LIST_CHANNELS:
-            await refresh_table(guild, slot_name)
-            await asyncio.sleep(1)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            delay = min((self.next_fire(n) - now).total_seconds() for n in self.jobs) if self.jobs else 3600
+            self.wake.clear()
+            try:
+                # Capped so a wall-clock jump is noticed within the hour.
+                await asyncio.wait_for(self.wake.wait(), timeout=min(delay, 3600))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, name):
+        func, tz = self.jobs[name][3:]
+        print(f"⏰ Running scheduled job: {name}")
+        self.running = name
+        try:
+            await func()
+        except Exception as e:
+            print(f"❌ Scheduled job {name} failed: {e}")
+        finally:
+            self.running = None
+        at = datetime.datetime.now(tz).isoformat()
+        data["schedule"]["last_run"][name] = at
+        log_change("job_run", name=name, at=at)
+
+scheduler = Scheduler()
+
+async def remove_roles_bounded(guild, removals):
+    """
+    Takes slot roles off members, RESET_ROLE_CONCURRENCY requests at a time.
+    discord.py waits out 429s per route bucket; the semaphore keeps us from
+    queueing hundreds of requests against that one bucket at once.
+    Returns (removed, failed, missing_members).
+    """
+    sem = asyncio.Semaphore(RESET_ROLE_CONCURRENCY)
 
-        log_ch = guild.get_channel(ADMIN_LOG_CHANNEL_ID)
-        if log_ch: await log_ch.send("🕛 **Daily Reset & Cleanup Complete.**")
-        
-        global REGISTRATION_OPEN
-        REGISTRATION_OPEN = True
+    async def remove(uid, role):
+        async with sem:
+            member = await resolve_member(guild, uid)
+            if not member: return "missing"
+            member_cache.discard(guild.id, member.id)
+            try:
+                await member.remove_roles(role, reason="Daily reset")
+                return "removed"
+            except discord.HTTPException:
+                return "failed"
+
+    results = await asyncio.gather(*(remove(uid, role) for uid, role in removals))
+    return results.count("removed"), results.count("failed"), results.count("missing")
+
+async def daily_reset_task(t):
+    guild = bot.get_guild(t.guild_id)
+    if not guild: return
+    print(f"🕛 MIDNIGHT RESET ({guild.name}): Cleaning up...")
+    started = time.perf_counter()
+
+    removals = []
+    for slot_name, uids in t.slots.items():
+        role_name = t.slot_roles.get(slot_name)
+        role = get_role(guild, role_name)
+        if role:
+            removals.extend((uid, role) for uid in uids)
+        t.slots[slot_name] = []
+
+    for uid in t.teams:
+        t.teams[uid]["booked_slots"] = []
+    t.waitlists.clear()
+    t.availability.rebuild()
+    t.log("reset")
+
+    uids_to_delete = t.expiry_index.pop_expired(time.time())
+    for uid in uids_to_delete:
+        delete_team(t, uid)
+        print(f"🗑️ Deleted expired data for User ID: {uid}")
+
+    # State is already cleared, so the tables can update while roles are being removed.
+    for slot_name in t.slot_list_channels:
+        refresh_table(guild, slot_name)
+
+    removed, failed, missing = await remove_roles_bounded(guild, removals)
+    duration = time.perf_counter() - started
+    print(f"🕛 Reset done in {duration:.1f}s: {removed} roles removed, {failed} failed, {missing} members not found")
+
+    log_ch = guild.get_channel(t.admin_log_channel_id)
+    if log_ch:
+        await log_ch.send(
+            "🕛 **Daily Reset & Cleanup Complete.**\n"
+            f"Roles removed: **{removed}** • Failed: **{failed}** • Members not found: **{missing}**\n"
+            f"Expired teams deleted: **{len(uids_to_delete)}** • Took **{duration:.1f}s**"
+        )
+    
+    t.registration_open = True
+
+async def lock_registration(guild):
+    t = get_tournament(guild)
+    t.registration_open = False
+    reg_ch = guild.get_channel(t.registration_channel_id)
+    if reg_ch: await reg_ch.send("⛔ **REGISTRATION CLOSED.**")
+
+def schedule_job(name, job):
+    """Registers an admin-defined job ({"kind": "lock"|"notify", "guild": id, "at": "HH:MM", ...})."""
+    hour, minute = (int(x) for x in job["at"].split(":"))
+    t = tournaments[int(job["guild"])]
+    if job["kind"] == "lock":
+        async def run():
+            guild = bot.get_guild(t.guild_id)
+            if guild: await lock_registration(guild)
+        # Still lock if the bot was down at lock time, unless it is far too late.
+        scheduler.add_daily(name, hour, minute, run, grace=2 * 3600, tz=t.tz)
+    elif job["kind"] == "notify":
+        async def run():
+            guild = bot.get_guild(t.guild_id)
+            if guild: await send_start_notifications(guild, job["minutes"], job.get("slot"), job.get("dm", False))
+        # A late "starting in N minutes" is wrong, so missed notifications are dropped.
+        scheduler.add_daily(name, hour, minute, run, tz=t.tz)
+
+def start_jobs(t):
+    scheduler.add_daily(t.job_name("daily_reset"), 0, 0, functools.partial(daily_reset_task, t), grace=24 * 3600, tz=t.tz)
+    for name, job in data["schedule"]["jobs"].items():
+        if job.get("guild") == t.key:
+            schedule_job(name, job)
+    t.jobs_started = True
 
 # ================= 7. VERIFICATION SYSTEM (UPDATED) =================
+verify_semaphore = asyncio.Semaphore(VERIFY_ROLE_CONCURRENCY)
+
+async def grant_role_to_all(members, role, reason):
+    """
+    Gives every member the role concurrently. If any grant fails, the role is
+    taken back from those who already got it, so a team is verified either
+    completely or not at all. Returns the first error, or None on success.
+    """
+    async def grant(member):
+        async with verify_semaphore:
+            try:
+                await member.add_roles(role, reason=reason)
+            except discord.HTTPException as e:
+                return e
+
+    results = await asyncio.gather(*(grant(m) for m in members))
+    errors = [e for e in results if e is not None]
+    if not errors:
+        return None
+
+    async def rollback(member):
+        async with verify_semaphore:
+            await member.remove_roles(role, reason="Verification rolled back")
+
+    granted = [m for m, e in zip(members, results) if e is None]
+    for member, result in zip(granted, await asyncio.gather(*(rollback(m) for m in granted), return_exceptions=True)):
+        if isinstance(result, Exception):
+            print(f"⚠️ Could not roll back verify role for {member}: {result}")
+    return errors[0]
+
+def record_verified(t, uids, team_name, by):
+    """Stores the whole team's verification as one journal record."""
+    at = int(time.time())
+    for uid in uids:
+        t.verified[uid] = {"team": team_name, "by": by, "at": at}
+    t.log("verify", members=uids, team=team_name, by=by, at=at)
+
+def backfill_verified(t, guild):
+    """Records members who got the verify role before verifications were stored."""
+    role = get_role(guild, t.verify_role_name)
+    if t.verified or not role: return
+    if LEAN_GATEWAY:
+        # role.members only sees cached members; run once in full mode to record them.
+        print(f"⚠️ Lean gateway mode: previously verified members in {guild.name} are not recorded")
+        return
+    uids = [str(m.id) for m in role.members]
+    if not uids: return
+    record_verified(t, uids, None, None)
+    print(f"🛡️ Recorded {len(uids)} previously verified members in {guild.name}")
+
 class PlayerSelect(ui.UserSelect):
     def __init__(self, team_name):
         self.team_name = team_name
         super().__init__(placeholder="Select the 4 Players...", min_values=4, max_values=4)
 
+    @interaction_handler()
     async def callback(self, interaction: discord.Interaction):
-        role = discord.utils.get(interaction.guild.roles, name=VERIFY_ROLE_NAME)
+        t = get_tournament(interaction.guild)
+        role = get_role(interaction.guild, t.verify_role_name)
         if not role:
-            await interaction.response.send_message(f"❌ Error: Role '{VERIFY_ROLE_NAME}' not found.", ephemeral=True)
+            await reply(interaction, f"❌ Error: Role '{t.verify_role_name}' not found.")
             return
 
         members = self.values # List of selected Discord Members
+        uids = [str(m.id) for m in members]
 
         # --- 🔴 STOP IF ALREADY VERIFIED ---
-        # This loop checks if any of the selected members already have the role.
-        already_verified = []
-        for member in members:
-            if role in member.roles:
-                already_verified.append(member.mention)
+        # Checked against the stored verifications, and against ones still in
+        # flight so two admins can't verify the same player at once.
+        already_verified = [m.mention for m, uid in zip(members, uids) if uid in t.verified or uid in t.verifying]
         
         if already_verified:
             # If anyone is found, STOP everything.
             player_list = ", ".join(already_verified)
-            await interaction.response.send_message(
-                f"⛔ **Verification Failed!**\nThe following players are already verified:\n{player_list}\n\nThey cannot be verified again.", 
-                ephemeral=True
+            await reply(
+                interaction,
+                f"⛔ **Verification Failed!**\nThe following players are already verified:\n{player_list}\n\nThey cannot be verified again."
             )
             return
         # -----------------------------------
 
-        await interaction.response.defer(ephemeral=True)
-
-        member_details = []
-        for member in members:
-            try:
-                await member.add_roles(role)
-                member_details.append(f"• {member.mention} (`{member.name}`)")
-            except discord.Forbidden:
-                await interaction.followup.send("❌ Error: Check Bot permissions (Roles).", ephemeral=True)
-                return
+        t.verifying.update(uids)
+        try:
+            error = await grant_role_to_all(members, role, f"Verified {self.team_name}")
+            if error is None:
+                record_verified(t, uids, self.team_name, str(interaction.user.id))
+        finally:
+            t.verifying.difference_update(uids)
+
+        if error is not None:
+            if isinstance(error, discord.Forbidden):
+                await reply(interaction, "❌ Error: Check Bot permissions (Roles).")
+            else:
+                await reply(interaction, f"❌ Verification failed, no roles were given: {error}")
+            return
 
+        member_details = [f"• {member.mention} (`{member.name}`)" for member in members]
         player_names_str = "\n".join(member_details)
 
-        # 1. Send Log to Verified Channel
-        log_channel = interaction.guild.get_channel(VERIFIED_TEAM_LOG_ID)
-        if log_channel:
-            log_embed = discord.Embed(
-                title="🛡️ New Team Verified",
-                color=discord.Color.gold(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            log_embed.add_field(name="Team Name", value=self.team_name, inline=False)
-            log_embed.add_field(name="Verified Players", value=player_names_str, inline=False)
-            log_embed.set_footer(text=f"Verified by {interaction.user.name}")
-            await log_channel.send(embed=log_embed)
+        # 1. Queue the log for the verified channel's next digest
+        audit_log.record(
+            interaction.guild.id, "team_verified", interaction.guild.get_channel(t.verified_team_log_id),
+            team=self.team_name, members=uids, by=str(interaction.user.id)
+        )
 
         # 2. Confirmation to User
         embed = discord.Embed(
@@ -378,12 +1541,13 @@ class PlayerSelectView(ui.View):
 class TeamNameModal(ui.Modal, title="Step 1: Team Name"):
     name_input = ui.TextInput(label="Enter Team Name", placeholder="e.g. Galaxy Crows", max_length=50)
 
+    @interaction_handler()
     async def on_submit(self, interaction: discord.Interaction):
         team_name = self.name_input.value
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             f"Please select the **4 players** for **{team_name}** below:", 
-            view=PlayerSelectView(team_name), 
-            ephemeral=True
+            view=PlayerSelectView(team_name)
         )
 
 class PersistentVerifyView(ui.View):
@@ -391,6 +1555,7 @@ class PersistentVerifyView(ui.View):
         super().__init__(timeout=None) 
 
     @ui.button(label="Verify Team", style=discord.ButtonStyle.green, emoji="🛡️", custom_id="verify_btn_1")
+    @interaction_handler(defer=False)
     async def verify_button(self, interaction: discord.Interaction, button: ui.Button):
         await interaction.response.send_modal(TeamNameModal())
 
@@ -402,86 +1567,98 @@ class TeamModal(discord.ui.Modal, title="Update / New Team"):
     p3 = discord.ui.TextInput(label="Player 3", placeholder="IGN", required=False)
     p4 = discord.ui.TextInput(label="Player 4", placeholder="IGN", required=False)
     
+    @interaction_handler()
     async def on_submit(self, interaction: discord.Interaction):
         uid = str(interaction.user.id)
+        t = get_tournament(interaction.guild)
         
         # --- 🔴 DUPLICATE REGISTRATION CHECK ---
         players_input = [self.p1.value, self.p2.value, self.p3.value, self.p4.value]
-        is_duplicate, error_msg = check_duplicates(uid, self.team.value, players_input)
+        is_duplicate, error_msg = check_duplicates(t, uid, self.team.value, players_input)
         
         if is_duplicate:
-            await interaction.response.send_message(error_msg, ephemeral=True)
+            await reply(interaction, error_msg)
             return
         # ----------------------------------------
 
-        data["teams"][uid] = {
+        now = datetime.datetime.utcnow()
+        upsert_team(t, uid, {
             "team": self.team.value,
             "players": [p for p in players_input if p], 
             "booked_slots": [],
-            "last_updated": datetime.datetime.utcnow().isoformat()
-        }
-        save_data(data)
+            "last_updated": now.isoformat(),
+            "updated_at": int(now.replace(tzinfo=datetime.timezone.utc).timestamp())
+        })
         
-        log_channel = interaction.guild.get_channel(ADMIN_LOG_CHANNEL_ID)
-        if log_channel:
-            embed = discord.Embed(title="🆕 Team Registered/Updated", color=discord.Color.blue())
-            embed.add_field(name="Team", value=self.team.value)
-            embed.add_field(name="User", value=f"<@{uid}>")
-            await log_channel.send(embed=embed)
-
-        await interaction.response.send_message(
+        audit_log.record(
+            interaction.guild.id, "team_saved", interaction.guild.get_channel(t.admin_log_channel_id),
+            uid=uid, team=self.team.value
+        )
+
+        await reply(
+            interaction,
             f"✅ Team **{self.team.value}** Saved! Select a Match:", 
-            view=SlotSelectView(), 
-            ephemeral=True
+            view=SlotSelectView(t)
         )
 
 class SlotButton(discord.ui.Button):
-    def __init__(self, slot):
-        count = len(data["slots"][slot])
-        display_name = slot.replace("_", " ") 
-        label = f"{display_name} ({count}/{MAX_SLOTS})"
-        style = discord.ButtonStyle.green if count < MAX_SLOTS else discord.ButtonStyle.red
-        super().__init__(label=label, style=style, disabled=(count >= MAX_SLOTS))
+    def __init__(self, slot, label, style, disabled, version):
+        super().__init__(label=label, style=style, disabled=disabled)
         self.slot = slot
+        self.version = version
 
+    # Claiming never waits on Discord, so the reply itself is the acknowledgement.
+    @interaction_handler(defer=False)
     async def callback(self, interaction: discord.Interaction):
-        success = await add_player_to_slot(interaction, self.slot)
-        if success:
-            await interaction.response.send_message(f"✅ Claimed **{self.slot}**.", ephemeral=True)
+        t = get_tournament(interaction.guild)
+        uid = str(interaction.user.id)
+        stale = self.version != t.availability.version
+        if stale and t.availability.is_full(self.slot) and t.registration_open and uid in t.teams:
+            # The match filled up after this list was shown; queue without taking its lock.
+            success, msg = join_waitlist(t, uid, self.slot)
         else:
-             if not interaction.response.is_done():
-                 await interaction.response.send_message("❌ Failed or Full.", ephemeral=True)
+            success, msg = await add_player_to_slot(interaction, self.slot)
+        await reply(interaction, msg)
 
 class SlotSelectView(discord.ui.View):
-    def __init__(self):
+    def __init__(self, t):
         super().__init__(timeout=60)
-        for s in SLOT_LIST_CHANNELS:
-            self.add_item(SlotButton(s))
+        version = t.availability.version
+        for slot, label, style, disabled in t.availability.button_specs():
+            self.add_item(SlotButton(slot, label, style, disabled, version))
 
 class AutoClaimView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
     @discord.ui.button(label="⚡ Quick Claim (Auto-Assign)", style=discord.ButtonStyle.blurple, custom_id="auto_claim_btn")
+    @interaction_handler()
     async def auto_claim(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not REGISTRATION_OPEN:
-            await interaction.response.send_message("⛔ **Claims Closed.**", ephemeral=True)
+        t = get_tournament(interaction.guild)
+        if not t.registration_open:
+            await reply(interaction, "⛔ **Claims Closed.**")
             return
         uid = str(interaction.user.id)
-        if uid not in data["teams"]:
-            await interaction.response.send_message("❌ Register first.", ephemeral=True)
+        if uid not in t.teams:
+            await reply(interaction, "❌ Register first.")
             return
         assigned = None
-        for slot_name in SLOT_LIST_CHANNELS:
-            if len(data["slots"][slot_name]) < MAX_SLOTS and uid not in data["slots"][slot_name]:
+        for slot_name in t.slot_list_channels:
+            if len(t.slots[slot_name]) < t.max_slots and uid not in t.slots[slot_name]:
                 assigned = slot_name
                 break
         if assigned:
-            success = await add_player_to_slot(interaction, assigned)
-            if success:
-                await interaction.response.send_message(f"✅ Auto-Assigned to **{assigned}**!", ephemeral=True)
-        else:
-            await interaction.response.send_message("❌ All matches are full!", ephemeral=True)
+            success, msg = await add_player_to_slot(interaction, assigned)
+            await reply(interaction, f"✅ Auto-Assigned to **{assigned}**!" if success else msg)
+            return
+        # Everything is full: wait in the shortest line rather than retrying.
+        candidates = [s for s in t.slot_list_channels if uid not in t.slots[s]]
+        if not candidates:
+            await reply(interaction, "❌ All matches are full!")
+            return
+        shortest = min(candidates, key=lambda s: len(t.waitlists.get(s, [])))
+        success, msg = join_waitlist(t, uid, shortest)
+        await reply(interaction, msg)
 
 class TeamChoiceView(discord.ui.View):
     def __init__(self, team_name):
@@ -489,10 +1666,13 @@ class TeamChoiceView(discord.ui.View):
         self.team_name = team_name
 
     @discord.ui.button(label=f"🟢 Continue as", style=discord.ButtonStyle.success)
+    @interaction_handler()
     async def continue_old(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message(f"✅ Using team: **{self.team_name}**. Select Match:", view=SlotSelectView(), ephemeral=True)
+        t = get_tournament(interaction.guild)
+        await reply(interaction, f"✅ Using team: **{self.team_name}**. Select Match:", view=SlotSelectView(t))
 
     @discord.ui.button(label="🔵 New / Update Team", style=discord.ButtonStyle.primary)
+    @interaction_handler(defer=False)
     async def update_new(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.send_modal(TeamModal())
 
@@ -501,18 +1681,16 @@ class MainRegisterView(discord.ui.View):
         super().__init__(timeout=None)
     
     @discord.ui.button(label="📝 Register Team", style=discord.ButtonStyle.green, custom_id="reg_btn")
+    @interaction_handler(defer=False)
     async def register(self, interaction: discord.Interaction, button: discord.ui.Button):
         uid = str(interaction.user.id)
-        if uid in data["teams"]:
-            last_updated = data["teams"][uid].get("last_updated")
-            if last_updated:
-                reg_time = datetime.datetime.fromisoformat(last_updated)
-                if (datetime.datetime.utcnow() - reg_time).days >= DATA_EXPIRY_DAYS:
-                    del data["teams"][uid]
-                    save_data(data)
-                    await interaction.response.send_modal(TeamModal())
-                    return
-            team_name = data["teams"][uid]["team"]
+        t = get_tournament(interaction.guild)
+        if uid in t.teams:
+            if t.expiry_index.is_expired(uid, time.time()):
+                delete_team(t, uid)
+                await interaction.response.send_modal(TeamModal())
+                return
+            team_name = t.teams[uid]["team"]
             await interaction.response.send_message(
                 f"⚠️ You are already registered as **{team_name}**.\nDo you want to continue or register a new team?", 
                 view=TeamChoiceView(team_name), 
@@ -522,71 +1700,226 @@ class MainRegisterView(discord.ui.View):
             await interaction.response.send_modal(TeamModal())
 
 class CancelDropdown(discord.ui.Select):
-    def __init__(self, booked_slots):
+    def __init__(self, booked_slots, waiting=None):
         options = []
         for slot in booked_slots:
             display_name = slot.replace("_", " ")
             options.append(discord.SelectOption(label=f"Leave {display_name}", value=slot, emoji="🗑️"))
+        if waiting:
+            display_name = waiting.replace("_", " ")
+            options.append(discord.SelectOption(label=f"Leave {display_name} waitlist", value=f"WAITLIST:{waiting}", emoji="⏳"))
         options.append(discord.SelectOption(label="Leave ALL Matches", value="ALL", emoji="❌"))
         super().__init__(placeholder="Select match to leave...", min_values=1, max_values=1, options=options)
 
+    @interaction_handler()
     async def callback(self, interaction: discord.Interaction):
         if self.values[0] == "ALL":
             success, msg = await remove_all_slots_logic(interaction)
+        elif self.values[0].startswith("WAITLIST:"):
+            slot_name = self.values[0].split(":", 1)[1]
+            left = leave_waitlist(get_tournament(interaction.guild), str(interaction.user.id), slot_name)
+            msg = f"✅ Left the **{slot_name}** waitlist." if left else "You are not on that waitlist."
         else:
             success, msg = await remove_single_slot_logic(interaction, self.values[0])
-        await interaction.response.send_message(msg, ephemeral=True)
+        await reply(interaction, msg)
 
 class CancelAndClaimView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
     @discord.ui.button(label="🗑️ Leave Match", style=discord.ButtonStyle.danger, custom_id="cancel_slot_btn")
+    @interaction_handler()
     async def cancel_slot(self, interaction: discord.Interaction, button: discord.ui.Button):
         uid = str(interaction.user.id)
-        if uid not in data["teams"] or not data["teams"][uid].get("booked_slots"):
-             await interaction.response.send_message("⚠️ You have no active matches.", ephemeral=True)
+        t = get_tournament(interaction.guild)
+        waiting = waiting_for(t, uid)
+        if uid not in t.teams or not (t.teams[uid].get("booked_slots") or waiting):
+             await reply(interaction, "⚠️ You have no active matches.")
              return
-        booked = data["teams"][uid]["booked_slots"]
-        await interaction.response.send_message("Select match to leave:", view=discord.ui.View().add_item(CancelDropdown(booked)), ephemeral=True)
+        booked = t.teams[uid]["booked_slots"]
+        await reply(interaction, "Select match to leave:", view=discord.ui.View().add_item(CancelDropdown(booked, waiting)))
 
     @discord.ui.button(label="♻️ Join Open Match", style=discord.ButtonStyle.primary, custom_id="claim_open_btn")
+    @interaction_handler()
     async def claim_open(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not REGISTRATION_OPEN:
-            await interaction.response.send_message("⛔ **Claims Closed.**", ephemeral=True)
+        t = get_tournament(interaction.guild)
+        if not t.registration_open:
+            await reply(interaction, "⛔ **Claims Closed.**")
             return
         uid = str(interaction.user.id)
-        if uid not in data["teams"]:
-            await interaction.response.send_message("❌ Register first.", ephemeral=True)
+        if uid not in t.teams:
+            await reply(interaction, "❌ Register first.")
             return
-        await interaction.response.send_message("✅ Checking availability...", view=SlotSelectView(), ephemeral=True)
+        await reply(interaction, "✅ Checking availability...", view=SlotSelectView(t))
 
 # ================= 9. BOT CLASS & ADMIN COMMANDS =================
 class SlotBot(commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix="!", intents=discord.Intents.all())
+        super().__init__(command_prefix="!", **gateway_options(LEAN_GATEWAY))
     
     async def setup_hook(self):
+        await asyncio.to_thread(load_state)
+        # Hosts restart the bot with SIGTERM, which discord.py doesn't handle; close
+        # cleanly so the claims still queued for the writer thread reach the disk.
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except NotImplementedError:
+            pass  # Windows
         self.add_view(MainRegisterView())
         self.add_view(AutoClaimView())
         self.add_view(CancelAndClaimView())
         self.add_view(PersistentVerifyView())
+        audit_log.start()
+        if METRICS_ENABLED:
+            self.lag_probe = metrics.start(self.http)
+        self.web_runner = await keep_alive.keep_alive(readiness, status, metrics.render if METRICS_ENABLED else None)
+
+    async def close(self):
+        # Post the last digest while the connection is still up.
+        await audit_log.close()
+        await super().close()
+        # Write out everything still queued before the process exits.
+        await asyncio.to_thread(store.close)
 
 bot = SlotBot()
+started_at = time.time()
+
+# --- Health endpoints (served by keep_alive.py) ---
+def gateway_latency():
+    return round(bot.latency, 3) if bot.latency < float("inf") else None
+
+def readiness():
+    checks = {}
+    latency = gateway_latency()
+    checks["gateway"] = {
+        "ok": bot.is_ready() and not bot.is_closed() and latency is not None and latency < READY_MAX_LATENCY,
+        "latency": latency,
+    }
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    resets = {}
+    for t in tournaments.values():
+        name = t.job_name("daily_reset")
+        last_run = data["schedule"]["last_run"].get(name)
+        # A reset more than a day old means midnight came and went without one.
+        overdue = last_run is None or (now - datetime.datetime.fromisoformat(last_run)).total_seconds() > 25 * 3600
+        resets[t.key] = {"ok": scheduler.running == name or not overdue, "last_run": last_run, "running": scheduler.running == name}
+    checks["daily_reset"] = {
+        "ok": scheduler.task is not None and not scheduler.task.done() and all(r["ok"] for r in resets.values()),
+        "guilds": resets,
+    }
+
+    checks["store"] = {
+        "ok": store.error is None,
+        "backend": STORAGE_BACKEND,
+        "error": str(store.error) if store.error else None,
+    }
+    return all(c["ok"] for c in checks.values()), checks
+
+match_fill = metrics.Gauge("slotbot_match_filled", "Teams booked per match", ("guild", "match"))
+match_capacity = metrics.Gauge("slotbot_match_capacity", "Slots per match", ("guild",))
+team_count = metrics.Gauge("slotbot_teams", "Registered teams", ("guild",))
+
+def collect_tournament_metrics():
+    match_fill.clear()
+    for t in tournaments.values():
+        team_count.set(len(t.teams), t.key)
+        match_capacity.set(t.max_slots, t.key)
+        for s in t.slot_list_channels:
+            match_fill.set(len(t.slots[s]), t.key, s)
+
+metrics.collectors.append(collect_tournament_metrics)
+
+def status():
+    guilds = {}
+    for t in tournaments.values():
+        guild = bot.get_guild(t.guild_id)
+        guilds[t.key] = {
+            "name": guild.name if guild else None,
+            "registration_open": t.registration_open,
+            "teams": len(t.teams),
+            "matches": {s: {"filled": len(t.slots[s]), "max": t.max_slots} for s in t.slot_list_channels},
+        }
+    return {
+        "user": str(bot.user) if bot.user else None,
+        "uptime": int(time.time() - started_at),
+        "gateway_latency": gateway_latency(),
+        "gateway_mode": GATEWAY_MODE,
+        "guilds": guilds,
+    }
 
 def is_admin_channel():
     async def predicate(ctx):
-        if ctx.channel.id != ADMIN_COMMAND_CHANNEL_ID:
-            await ctx.send(f"❌ Wrong Channel! Use <#{ADMIN_COMMAND_CHANNEL_ID}>", delete_after=5)
+        t = get_tournament(ctx.guild)
+        if t is None:
+            await ctx.send("⚠️ Tournaments are not set up on this server.", delete_after=5)
+            return False
+        if ctx.channel.id != t.admin_command_channel_id:
+            await ctx.send(f"❌ Wrong Channel! Use <#{t.admin_command_channel_id}>", delete_after=5)
             return False
         return True
     return commands.check(predicate)
 
+def start_guild_jobs():
+    for guild in bot.guilds:
+        t = get_tournament(guild)
+        if t and not t.jobs_started:
+            backfill_verified(t, guild)
+            start_jobs(t)
+    scheduler.start()
+
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user}")
-    if not daily_reset_task.is_running():
-        daily_reset_task.start()
+    start_guild_jobs()
+    await restore_tables()
+
+async def restore_tables():
+    """Checks the stored tables of every guild concurrently, once per run, so nobody has to !init_tables."""
+    started = time.perf_counter()
+    pending = []
+    for guild in bot.guilds:
+        t = get_tournament(guild)
+        if t and not t.tables_restored:
+            t.tables_restored = True
+            pending.append(t.renderer.restore(guild))
+    if not pending: return
+    results = await asyncio.gather(*pending)
+    current = sum(r[0] for r in results)
+    stale = sum(r[1] for r in results)
+    print(f"📋 Tables checked in {time.perf_counter() - started:.2f}s: {current} current, {stale} re-rendering")
+
+@bot.event
+async def on_guild_join(guild):
+    start_guild_jobs()
+
+@bot.event
+async def on_member_update(before, after):
+    # Taking the verify role away by hand makes the member verifiable again.
+    t = tournaments.get(after.guild.id)
+    uid = str(after.id)
+    if not t or uid not in t.verified: return
+    role = get_role(after.guild, t.verify_role_name)
+    if role and role in before.roles and role not in after.roles:
+        del t.verified[uid]
+        t.log("unverify", members=[uid])
+
+def invalidate_roles(guild):
+    t = tournaments.get(guild.id)
+    if t: t.roles.clear()
+
+@bot.event
+async def on_guild_role_create(role):
+    invalidate_roles(role.guild)
+
+@bot.event
+async def on_guild_role_delete(role):
+    invalidate_roles(role.guild)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        invalidate_roles(after.guild)
 
 # --- NEW COMMAND: CLEAR CHAT (ANY CHANNEL) ---
 @bot.command()
@@ -604,8 +1937,12 @@ async def clear(ctx, amount: int = 100):
 @bot.command()
 @commands.has_permissions(administrator=True)
 async def setup_verify(ctx):
-    if ctx.channel.id != VERIFY_CHANNEL_ID:
-        await ctx.send(f"⚠️ Warning: This is not the configured VERIFY_CHANNEL ({VERIFY_CHANNEL_ID}).")
+    t = get_tournament(ctx.guild)
+    if t is None:
+        await ctx.send("⚠️ Tournaments are not set up on this server.")
+        return
+    if ctx.channel.id != t.verify_channel_id:
+        await ctx.send(f"⚠️ Warning: This is not the configured VERIFY_CHANNEL ({t.verify_channel_id}).")
     
     embed = discord.Embed(
         title="🛡️ Team Verification",
@@ -619,96 +1956,352 @@ async def setup_verify(ctx):
 @bot.command()
 @commands.has_permissions(administrator=True)
 @is_admin_channel()
-async def force_remove(ctx, match_name: str, slot_number: int):
+async def force_remove(ctx, match_name: str, *slot_numbers: int):
+    """`!force_remove MATCH_1 3` or several at once: `!force_remove MATCH_1 3 7 12`."""
+    t = get_tournament(ctx.guild)
     match_key = match_name.upper()
-    if match_key not in SLOT_LIST_CHANNELS:
-        await ctx.send(f"❌ Invalid Name. Use: `MATCH_1`, `MATCH_2`, `MATCH_3`, `MATCH_4`")
+    if match_key not in t.slot_list_channels:
+        await ctx.send(f"❌ Invalid Name. Use: " + ", ".join(f"`{s}`" for s in t.slot_list_channels))
+        return
+    if not slot_numbers:
+        await ctx.send("❌ Give at least one slot number.")
+        return
+    registered_uids = t.slots.get(match_key, [])
+    empty = [n for n in slot_numbers if not 0 < n <= len(registered_uids)]
+    if empty:
+        await ctx.send(f"❌ Slot number {', '.join(map(str, empty))} is empty.")
+        return
+    # Slot numbers shift as teams leave, so pick every target before removing any.
+    targets = {registered_uids[n - 1]: n for n in sorted(set(slot_numbers))}
+    released = await release_bookings(ctx.guild, [(uid, match_key) for uid in targets])
+    removed = ", ".join(f"'{t.teams.get(uid, {}).get('team', 'Unknown')}' (Slot {targets[uid]})" for uid, _ in released)
+    await ctx.send(f"✅ **Admin Removed:** {removed or 'nobody'} from {match_key}.")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def import_teams(ctx, mode: str = None):
+    """Attach a CSV or JSON file. `!import_teams check` only validates it."""
+    t = get_tournament(ctx.guild)
+    if not ctx.message.attachments:
+        await ctx.send("❌ Attach a CSV (" + ", ".join(IMPORT_CSV_FIELDS) + ") or a JSON export.")
+        return
+    attachment = ctx.message.attachments[0]
+    raw = await attachment.read()
+
+    batch = ImportBatch(t)
+    try:
+        for row in read_import_rows(attachment.filename, raw):
+            batch.add(*row)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        await ctx.send(f"❌ Could not read `{attachment.filename}`: {e}")
         return
-    registered_uids = data["slots"].get(match_key, [])
-    index = slot_number - 1 
-    if index < 0 or index >= len(registered_uids):
-        await ctx.send(f"❌ Slot number {slot_number} is empty.")
+    if batch.errors:
+        shown = "\n".join(batch.errors[:15])
+        more = f"\n…and {len(batch.errors) - 15} more." if len(batch.errors) > 15 else ""
+        await ctx.send(f"❌ **Import rejected, nothing was changed.**\n{shown}{more}")
         return
-    target_uid = registered_uids[index]
-    await perform_removal(ctx.guild, target_uid, match_key)
-    team_name = data["teams"].get(target_uid, {}).get("team", "Unknown")
-    await ctx.send(f"✅ **Admin Removed:** Team '{team_name}' from {match_key} (Slot {slot_number}).")
+    bookings = sum(len(matches) for _, matches in batch.rows.values())
+    if mode == "check":
+        await ctx.send(f"✅ `{attachment.filename}` is valid: {len(batch.rows)} teams, {bookings} bookings.")
+        return
+
+    started = time.perf_counter()
+    claims = await apply_import(t, batch)
+    if claims is None:
+        await ctx.send("❌ Matches filled up while the file was being read. Nothing was changed, try again.")
+        return
+    for slot_name in {s for s, _ in claims}:
+        refresh_table(ctx.guild, slot_name)
+    msg = await ctx.send(f"📥 Imported **{len(batch.rows)}** teams and **{len(claims)}** bookings. Giving roles...")
+    await grant_imported_roles(ctx.guild, claims)
+    await msg.edit(content=f"📥 Imported **{len(batch.rows)}** teams and **{len(claims)}** bookings "
+                           f"in **{time.perf_counter() - started:.1f}s**.")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def export_teams(ctx, fmt: str = "csv"):
+    t = get_tournament(ctx.guild)
+    fmt = fmt.lower()
+    if fmt not in ("csv", "json"):
+        await ctx.send("❌ Use `!export_teams csv` or `!export_teams json`.")
+        return
+    payload = export_team_data(t, fmt).encode("utf-8")
+    await ctx.send(
+        f"📤 {len(t.teams)} teams.",
+        file=discord.File(io.BytesIO(payload), filename=f"teams-{ctx.guild.id}.{fmt}")
+    )
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 @is_admin_channel()
 async def setup(ctx):
+    t = get_tournament(ctx.guild)
     await ctx.message.delete()
     msg = await ctx.send("⚙️ **Configuring...**")
-    await setup_channel_perms(ctx.guild)
+    started = time.perf_counter()
+    edited, unchanged, failed = await setup_channel_perms(ctx.guild)
+    perms_took = time.perf_counter() - started
     
-    reg_ch = ctx.guild.get_channel(REGISTRATION_CHANNEL_ID)
+    reg_ch = ctx.guild.get_channel(t.registration_channel_id)
     if reg_ch:
         await reg_ch.purge(limit=5)
         await reg_ch.send("📝 **TOURNAMENT REGISTRATION**", view=MainRegisterView())
         await reg_ch.send("⚡ **Quick Actions:**", view=AutoClaimView())
     
-    can_ch = ctx.guild.get_channel(CANCEL_CLAIM_CHANNEL_ID)
+    can_ch = ctx.guild.get_channel(t.cancel_claim_channel_id)
     if can_ch:
         await can_ch.purge(limit=5)
         embed = discord.Embed(title="Match Management", description="Leave your match or join open spots.", color=discord.Color.orange())
         await can_ch.send(embed=embed, view=CancelAndClaimView())
 
-    await msg.edit(content="✅ **Setup Complete!**")
+    summary = f"🔒 Channel permissions: **{len(edited)}** updated, **{len(unchanged)}** already correct"
+    if failed:
+        summary += f", **{len(failed)}** failed ({', '.join(ch.mention for ch in failed)})"
+    await msg.edit(content=f"✅ **Setup Complete!**\n{summary} • took **{perms_took:.1f}s**")
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 @is_admin_channel()
 async def init_tables(ctx):
+    t = get_tournament(ctx.guild)
     await ctx.send("🔄 Initializing Live Tables...")
-    for slot_name in SLOT_LIST_CHANNELS:
-        await refresh_table(ctx.guild, slot_name)
-        await asyncio.sleep(1) 
+    await asyncio.gather(*(t.renderer.render(ctx.guild, slot_name, force=True) for slot_name in t.slot_list_channels))
     await ctx.send("✅ Tables are live!")
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 @is_admin_channel()
-async def notify_start(ctx, minutes: int, slot_name: str = None):
+async def notify_start(ctx, minutes: int, *options):
+    """`!notify_start 15 [MATCH_1] [dm]`. With `dm` every booked team is also messaged directly."""
+    slot_name, dm = parse_notify_options(options)
     await ctx.message.delete()
+    report, duration = await send_start_notifications(ctx.guild, minutes, slot_name, dm)
+    await ctx.send(f"✅ {notify_summary(report, duration)}", delete_after=10)
+
+def parse_notify_options(options):
+    dm = any(o.lower() == "dm" for o in options)
+    slots = [o for o in options if o.lower() != "dm"]
+    return (slots[0] if slots else None), dm
+
+def notify_summary(report, duration):
+    summary = f"Channels: **{report['channels']}** sent, **{report['channels_failed']}** failed"
+    if report["dms"] or report["dms_failed"]:
+        summary += f" • DMs: **{report['dms']}** delivered, **{report['dms_failed']}** failed"
+    return summary + f" • Took **{duration:.1f}s**"
+
+async def send_start_notifications(guild, minutes, slot_name=None, dm=False):
+    """
+    Pings every match channel at once and, with `dm`, also messages the
+    member who registered each booked team, NOTIFY_DM_CONCURRENCY at a time
+    (a team in several matches gets one DM). The counts go to the admin log
+    channel and are returned as (Counter, seconds).
+    """
+    t = get_tournament(guild)
+    started = time.perf_counter()
     target_slot = slot_name.upper() if slot_name else None
-    count = 0
-    for s_name, channel_id in SLOT_LIST_CHANNELS.items():
-        if target_slot and s_name != target_slot: continue
-        role_name = SLOT_ROLES.get(s_name)
-        if not role_name: continue
-        role = discord.utils.get(ctx.guild.roles, name=role_name)
-        channel = ctx.guild.get_channel(channel_id)
-        room_channel_id = ROOM_CHANNELS.get(s_name)
-        room_channel = ctx.guild.get_channel(room_channel_id) if room_channel_id else None
-        if role and channel:
-            room_link = room_channel.mention if room_channel else "the room channel"
+    slot_names = [s for s in t.slot_list_channels if not target_slot or s == target_slot]
+    report = collections.Counter()
+
+    def room_link(s_name):
+        room_channel_id = t.room_channels.get(s_name)
+        room_channel = guild.get_channel(room_channel_id) if room_channel_id else None
+        return room_channel.mention if room_channel else "the room channel"
+
+    async def announce(s_name):
+        role_name = t.slot_roles.get(s_name)
+        if not role_name: return
+        role = get_role(guild, role_name)
+        channel = guild.get_channel(t.slot_list_channels[s_name])
+        if not (role and channel): return
+        try:
             await channel.send(
                 f"⚠️ {role.mention} **ATTENTION!** ⚠️\n"
                 f"Match is starting in **{minutes} minutes**!\n"
-                f"Please check {room_link} for ID & Password."
+                f"Please check {room_link(s_name)} for ID & Password."
             )
-            count += 1
-    await ctx.send(f"✅ Notification sent to {count} channels.", delete_after=5)
+            report["channels"] += 1
+        except discord.HTTPException:
+            report["channels_failed"] += 1
+
+    sem = asyncio.Semaphore(NOTIFY_DM_CONCURRENCY)
+
+    async def direct(uid, booked):
+        async with sem:
+            member = await resolve_member(guild, uid)
+            if member:
+                team_name = t.teams.get(uid, {}).get("team", "Your team")
+                lines = [f"• **{s.replace('_', ' ')}**: check {room_link(s)} for ID & Password." for s in booked]
+                try:
+                    await member.send(
+                        f"⚠️ **{team_name}**, your match on **{guild.name}** starts in **{minutes} minutes**!\n"
+                        + "\n".join(lines)
+                    )
+                    report["dms"] += 1
+                    return
+                except discord.HTTPException:
+                    pass  # DMs closed
+            report["dms_failed"] += 1
+
+    recipients = {}
+    if dm:
+        for s_name in slot_names:
+            for uid in t.slots.get(s_name, []):
+                recipients.setdefault(uid, []).append(s_name)
+
+    await asyncio.gather(
+        *(announce(s_name) for s_name in slot_names),
+        *(direct(uid, booked) for uid, booked in recipients.items())
+    )
+    duration = time.perf_counter() - started
+    print(f"📣 Start notification for {target_slot or 'all matches'} in {duration:.1f}s: {dict(report)}")
+
+    log_ch = guild.get_channel(t.admin_log_channel_id)
+    if log_ch:
+        try:
+            await log_ch.send(f"📣 **Start notification ({target_slot or 'all matches'}, {minutes} min).**\n"
+                              f"{notify_summary(report, duration)}")
+        except discord.HTTPException:
+            pass
+    return report, duration
+
+def parse_hhmm(value):
+    try:
+        hour, minute = (int(x) for x in value.split(":"))
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+def add_scheduled_job(name, job):
+    data["schedule"]["jobs"][name] = job
+    log_change("job_set", name=name, job=job)
+    schedule_job(name, job)
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def schedule_lock(ctx, at: str):
+    t = get_tournament(ctx.guild)
+    at = parse_hhmm(at)
+    if not at:
+        await ctx.send("❌ Use 24h local time, e.g. `!schedule_lock 19:50`")
+        return
+    add_scheduled_job(t.job_name("auto_lock"), {"kind": "lock", "guild": t.key, "at": at})
+    await ctx.send(f"⏰ Registration will lock daily at **{at}**.")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def schedule_notify(ctx, at: str, minutes: int, *options):
+    t = get_tournament(ctx.guild)
+    at = parse_hhmm(at)
+    if not at:
+        await ctx.send("❌ Use 24h local time, e.g. `!schedule_notify 19:45 15 MATCH_1 dm`")
+        return
+    slot_name, dm = parse_notify_options(options)
+    target = slot_name.upper() if slot_name else "ALL"
+    name = f"notify_{target}_{at.replace(':', '')}"
+    job = {"kind": "notify", "guild": t.key, "at": at, "minutes": minutes, "slot": slot_name and target, "dm": dm}
+    add_scheduled_job(t.job_name(name), job)
+    await ctx.send(f"⏰ `{name}`: start notification for **{target}**{' with DMs' if dm else ''} daily at **{at}**.")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def unschedule(ctx, name: str):
+    t = get_tournament(ctx.guild)
+    full_name = t.job_name(name)
+    if full_name not in data["schedule"]["jobs"]:
+        await ctx.send(f"❌ No scheduled job named `{name}`.")
+        return
+    del data["schedule"]["jobs"][full_name]
+    log_change("job_remove", name=full_name)
+    scheduler.remove(full_name)
+    await ctx.send(f"🗑️ Removed `{name}`.")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def schedules(ctx):
+    t = get_tournament(ctx.guild)
+    prefix = t.job_name("")
+    lines = []
+    for name in sorted((n for n in scheduler.jobs if n.startswith(prefix)), key=scheduler.next_fire):
+        last_run = data["schedule"]["last_run"].get(name, "never")
+        lines.append(f"{name[len(prefix):]:<24} next {scheduler.next_fire(name):%d %b %H:%M}  last {last_run[:16]}")
+    await ctx.send("⏰ **Scheduled Jobs**\n```text\n" + "\n".join(lines or ["(none)"]) + "\n```")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def reload_config(ctx):
+    global guild_configs
+    guild_configs = load_guild_configs()
+    t = get_tournament(ctx.guild)
+    config = guild_configs.get(t.key) or default_guild_config()
+    t.apply_config(config)
+    t.availability.rebuild()
+    # Jobs follow the guild's timezone, so register them again.
+    start_jobs(t)
+    await ctx.send(f"✅ Config reloaded: {len(t.slot_list_channels)} matches, {t.max_slots} slots each.")
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def latency(ctx):
+    if not handler_latency:
+        await ctx.send("No interactions handled yet.")
+        return
+    lines = [f"{'HANDLER':<28} {'N':>5} {'ACK p50':>8} {'ACK p99':>8} {'TOTAL p99':>9}"]
+    for name, samples in sorted(handler_latency.items()):
+        acks = [a for a, _ in samples]
+        totals = [t for _, t in samples]
+        lines.append(
+            f"{name[:28]:<28} {len(samples):>5} {percentile(acks, 50):>7.2f}s "
+            f"{percentile(acks, 99):>7.2f}s {percentile(totals, 99):>8.2f}s"
+        )
+    await ctx.send("⏱️ **Interaction latency** (deadline 3s)\n```text\n" + "\n".join(lines) + "\n```")
+
+@bot.command(name="audit")
+@commands.has_permissions(administrator=True)
+@is_admin_channel()
+async def audit_query(ctx, what: str = None, limit: int = 20):
+    """`!audit`, `!audit team_verified`, `!audit @member 50`: recent admin-log events from the audit file."""
+    uid = what.strip("<@!>") if what else None
+    kind = None
+    if uid and not uid.isdigit():
+        kind, uid = what, None
+    await audit_log.flush()  # include events still waiting for their digest
+    events = await asyncio.to_thread(audit.query, AUDIT_LOG_FILE, ctx.guild.id, kind, uid, min(limit, 50))
+    if not events:
+        await ctx.send("🗒️ No matching audit events.")
+        return
+    lines = [
+        f"`{datetime.datetime.fromtimestamp(e['at'], get_tournament(ctx.guild).tz):%d %b}` {audit_line(e)}"
+        for e in events
+    ]
+    text = "\n".join(lines)
+    while len(text) > 1900:
+        lines.pop(0)
+        text = "\n".join(lines)
+    await ctx.send(f"🗒️ **Last {len(lines)} audit events**\n{text}", allowed_mentions=discord.AllowedMentions.none())
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 @is_admin_channel()
 async def lock(ctx):
-    global REGISTRATION_OPEN
-    REGISTRATION_OPEN = False
     await ctx.send("⛔ **SYSTEM LOCKED.**")
-    reg_ch = ctx.guild.get_channel(REGISTRATION_CHANNEL_ID)
-    if reg_ch: await reg_ch.send("⛔ **REGISTRATION CLOSED.**")
+    await lock_registration(ctx.guild)
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 @is_admin_channel()
 async def unlock(ctx):
-    global REGISTRATION_OPEN
-    REGISTRATION_OPEN = True
+    get_tournament(ctx.guild).registration_open = True
     await ctx.send("✅ **SYSTEM UNLOCKED.** Registration is open.")
 
 if __name__ == "__main__":
-    keep_alive.keep_alive()  
     bot.run(TOKEN)
@@ -0,0 +1,229 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import re
+import time
+
+# ================= METRICS =================
+# Minimal Prometheus text-format instrumentation, served on /metrics by
+# keep_alive.py. Set `enabled` before decorating anything: while it is off
+# @timed returns the function untouched and nothing is ever collected, so a
+# disabled build pays nothing on the hot paths.
+
+enabled = False
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+registry = {}    # name -> metric, in registration order
+collectors = []  # callbacks run before every scrape, e.g. to refresh gauges
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values -> value
+        registry[name] = self
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def clear(self):
+        self.values.clear()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            # Per-bucket (not cumulative) counts, then sum and count.
+            state = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels(self.labelnames, labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {count}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+
+def render():
+    """The whole registry in Prometheus text exposition format."""
+    for collect in collectors:
+        collect()
+    lines = []
+    for metric in registry.values():
+        lines.extend(metric.lines())
+    return "\n".join(lines) + "\n"
+
+
+# --- Function timing ---
+def timed(name, help_text):
+    """
+    Records how long each call takes in `<name>_seconds` and counts calls
+    that raised in `<name>_errors_total`. Works on plain and async functions.
+    """
+    def decorator(func):
+        if not enabled:
+            return func
+        latency = Histogram(f"{name}_seconds", help_text)
+        errors = Counter(f"{name}_errors_total", f"Calls that raised: {help_text}")
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    latency.observe(time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    latency.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# --- Discord REST calls ---
+rest_requests = Counter("discord_rest_requests_total", "REST requests by route and outcome", ("method", "route", "status"))
+rest_latency = Histogram("discord_rest_request_seconds", "REST request latency, including rate-limit waits", ("method", "route"))
+rate_limits = Counter("discord_rate_limits_total", "429 responses by route", ("method", "route"))
+global_rate_limits = Counter("discord_global_rate_limits_total", "429 responses that were global (also counted by route)")
+
+# The route of the request in flight in this task. discord.py logs a 429 from
+# inside HTTPClient.request, so RateLimitHandler labels it with the same
+# template rest_requests uses.
+_current_route = contextvars.ContextVar("current_route", default=None)
+
+# Fallback for 429s logged outside instrument_http: the full URL with ids folded.
+_API_PREFIX = re.compile(r"^https?://[^/]+/api(/v\d+)?")
+_SNOWFLAKE = re.compile(r"/\d{15,}")
+
+
+def _route_of(url):
+    return _SNOWFLAKE.sub("/{id}", _API_PREFIX.sub("", url.split("?", 1)[0]))
+
+
+def instrument_http(http):
+    """Wraps discord.py's HTTPClient.request to count and time every REST call by route template."""
+    original = http.request
+
+    async def request(route, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        token = _current_route.set(route)
+        try:
+            return await original(route, **kwargs)
+        except Exception as e:
+            status = str(getattr(e, "status", type(e).__name__))
+            raise
+        finally:
+            _current_route.reset(token)
+            rest_requests.inc(route.method, route.path, status)
+            rest_latency.observe(time.perf_counter() - start, route.method, route.path)
+
+    http.request = request
+
+
+class RateLimitHandler(logging.Handler):
+    """
+    Counts the 429 warnings discord.http logs; they are the only place rate
+    limits surface. Every 429 logs the per-route warning, and a global one
+    then logs a second line, so that line only marks the 429 as global.
+    """
+    def emit(self, record):
+        if record.levelno < logging.WARNING:
+            return
+        msg = str(record.msg)
+        if msg.startswith("We are being rate limited") and len(record.args or ()) >= 2:
+            route = _current_route.get()
+            if route is not None:
+                rate_limits.inc(route.method, route.path)
+            else:
+                rate_limits.inc(record.args[0], _route_of(str(record.args[1])))
+        elif msg.startswith("Global rate limit"):
+            global_rate_limits.inc()
+
+
+# --- Event loop ---
+loop_lag = Gauge("event_loop_lag_last_seconds", "How late the last event loop wake-up was")
+loop_lag_hist = Histogram("event_loop_lag_seconds", "How late event loop wake-ups are")
+
+
+async def watch_loop_lag(interval=0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        loop_lag.set(lag)
+        loop_lag_hist.observe(lag)
+
+
+def start(http):
+    """Hooks the REST client and logging and starts the loop-lag probe. Call from setup_hook."""
+    instrument_http(http)
+    logging.getLogger("discord.http").addHandler(RateLimitHandler())
+    return asyncio.create_task(watch_loop_lag())
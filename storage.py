@@ -0,0 +1,728 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ================= JOURNAL STORAGE =================
+# data.json holds a compact snapshot of the whole state. Every change made
+# after that snapshot is appended as one small JSON line to data.json.journal,
+# so a single claim costs one short write no matter how many teams exist.
+# On startup the journal is folded back on top of the snapshot, and every
+# COMPACT_EVERY records the state is written out as a fresh snapshot.
+
+COMPACT_EVERY = 500
+FLUSH_INTERVAL = 1.0
+
+
+# Everything except the scheduler lives in a per-guild partition:
+#     {"guilds": {"<guild id>": {"teams": {}, "slots": {}, "waitlists": {}, "table_messages": {}, "verified": {}}},
+#      "schedule": {"last_run": {}, "jobs": {}}}
+# Data written before partitioning is kept under LEGACY_GUILD until the bot
+# adopts it for the server it was created on.
+LEGACY_GUILD = "legacy"
+
+
+def new_partition():
+    return {"teams": {}, "slots": {}, "waitlists": {}, "table_messages": {}, "verified": {}}
+
+
+def upgrade_layout(data):
+    """Moves a pre-partitioning snapshot under LEGACY_GUILD. Returns True if anything changed."""
+    if "guilds" in data:
+        return False
+    legacy = {
+        "teams": data.pop("teams", {}),
+        "slots": data.pop("slots", {}),
+        "table_messages": data.pop("table_messages", {}),
+    }
+    if "SLOT_1" in legacy["slots"]:
+        legacy["slots"] = {k.replace("SLOT", "MATCH"): v for k, v in legacy["slots"].items()}
+        for info in legacy["teams"].values():
+            info["booked_slots"] = [s.replace("SLOT", "MATCH") for s in info.get("booked_slots", [])]
+    data["guilds"] = {LEGACY_GUILD: legacy}
+    return True
+
+
+def _claim(part, rec):
+    slot, uid = rec["slot"], rec["uid"]
+    slot_list = part["slots"].setdefault(slot, [])
+    if uid not in slot_list:
+        slot_list.append(uid)
+    team = part["teams"].get(uid)
+    if team is not None:
+        booked = team.setdefault("booked_slots", [])
+        if slot not in booked:
+            booked.append(slot)
+
+
+def _release(part, rec):
+    slot, uid = rec["slot"], rec["uid"]
+    slot_list = part["slots"].get(slot, [])
+    if uid in slot_list:
+        slot_list.remove(uid)
+    team = part["teams"].get(uid)
+    if team is not None and slot in team.get("booked_slots", []):
+        team["booked_slots"].remove(slot)
+
+
+def _waitlist_join(part, rec):
+    queue = part.setdefault("waitlists", {}).setdefault(rec["slot"], [])
+    if rec["uid"] not in queue:
+        queue.append(rec["uid"])
+
+
+def _waitlist_leave(part, rec):
+    queue = part.setdefault("waitlists", {}).get(rec["slot"], [])
+    if rec["uid"] in queue:
+        queue.remove(rec["uid"])
+
+
+def _promote(part, rec):
+    _waitlist_leave(part, rec)
+    _claim(part, rec)
+
+
+def _import(part, rec):
+    for uid, info in rec["teams"].items():
+        part["teams"][uid] = info
+    for slot, uid in rec["claims"]:
+        _promote(part, {"slot": slot, "uid": uid})
+
+
+def _batch(part, rec):
+    for sub in rec["records"]:
+        OPS[sub["op"]](part, sub)
+
+
+def _team_upsert(part, rec):
+    part["teams"][rec["uid"]] = rec["team"]
+
+
+def _team_delete(part, rec):
+    part["teams"].pop(rec["uid"], None)
+
+
+def _table_message(part, rec):
+    part["table_messages"][rec["slot"]] = rec["message_id"]
+
+
+def _verify(part, rec):
+    verified = part.setdefault("verified", {})
+    for uid in rec["members"]:
+        verified[uid] = {"team": rec["team"], "by": rec.get("by"), "at": rec["at"]}
+
+
+def _unverify(part, rec):
+    verified = part.setdefault("verified", {})
+    for uid in rec["members"]:
+        verified.pop(uid, None)
+
+
+def _reset(part, rec):
+    for slot in part["slots"]:
+        part["slots"][slot] = []
+    part["waitlists"] = {}
+    for info in part["teams"].values():
+        info["booked_slots"] = []
+
+
+OPS = {
+    "claim": _claim,
+    "release": _release,
+    "waitlist_join": _waitlist_join,
+    "waitlist_leave": _waitlist_leave,
+    "promote": _promote,
+    "import": _import,
+    "batch": _batch,
+    "team_upsert": _team_upsert,
+    "team_delete": _team_delete,
+    "table_message": _table_message,
+    "reset": _reset,
+    "verify": _verify,
+    "unverify": _unverify,
+}
+
+
+def _schedule(data):
+    return data.setdefault("schedule", {"last_run": {}, "jobs": {}})
+
+
+def _job_set(data, rec):
+    _schedule(data)["jobs"][rec["name"]] = rec["job"]
+
+
+def _job_remove(data, rec):
+    _schedule(data)["jobs"].pop(rec["name"], None)
+
+
+def _job_run(data, rec):
+    _schedule(data)["last_run"][rec["name"]] = rec["at"]
+
+
+def _guild_adopt(data, rec):
+    legacy = data["guilds"].pop(rec["from"], None)
+    if legacy is not None:
+        data["guilds"][rec["guild"]] = legacy
+
+
+# Ops on the whole state rather than on one guild's partition.
+GLOBAL_OPS = {
+    "job_set": _job_set,
+    "job_remove": _job_remove,
+    "job_run": _job_run,
+    "guild_adopt": _guild_adopt,
+}
+
+
+def apply_record(data, rec):
+    op = rec["op"]
+    if op in GLOBAL_OPS:
+        GLOBAL_OPS[op](data, rec)
+        return
+    # Records written before partitioning carry no guild.
+    part = data["guilds"].setdefault(rec.get("guild", LEGACY_GUILD), new_partition())
+    OPS[op](part, rec)
+
+
+class JournalStore:
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        # Journal that was rotated out by a compaction still in progress.
+        self.old_journal_path = path + ".journal.old"
+        self.compact_every = compact_every
+        self.seq = 0
+        self.pending = 0
+        self._fh = None
+        # Last failed write, cleared once a snapshot has been written successfully.
+        self.error = None
+
+    # --- Loading ---
+    def load(self, default):
+        """Returns the snapshot with the journal replayed on top of it."""
+        data = default
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.seq = data.pop("_seq", 0)
+            if upgrade_layout(data):
+                self.pending += 1
+            for key, value in default.items():
+                data.setdefault(key, value)
+
+        for path in (self.old_journal_path, self.journal_path):
+            for rec in self._read_journal(path):
+                # Records already folded into the snapshot are skipped.
+                if rec["seq"] <= self.seq:
+                    continue
+                apply_record(data, rec)
+                self.seq = rec["seq"]
+                self.pending += 1
+        # Start every run from a fresh snapshot and an empty journal; this also
+        # drops a torn last line so later appends are not stranded behind it.
+        if self.pending or not os.path.exists(self.path):
+            self.compact(data)
+        return data
+
+    def _read_journal(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves a torn last line; everything before it is intact.
+                    print(f"⚠️ Ignoring corrupt journal line in {path}")
+                    return
+
+    # --- Writing ---
+    def append_lines(self, lines, sync=False):
+        """Appends already serialized records in a single write."""
+        try:
+            if self._fh is None:
+                self._fh = open(self.journal_path, "a")
+            self._fh.write("".join(line + "\n" for line in lines))
+            self._fh.flush()
+            if sync:
+                os.fsync(self._fh.fileno())
+        except OSError as e:
+            self.error = e
+            raise
+
+    def needs_compaction(self):
+        return self.pending >= self.compact_every
+
+    def begin_compaction(self, data):
+        """
+        Serializes the current state and rotates the journal. Must run on the
+        same thread that mutates `data`; the returned payload is then handed
+        to `finish_compaction`, which is safe to run in a worker thread.
+        `self.seq` must be the seq of the last record already applied to `data`.
+        """
+        payload = json.dumps({**data, "_seq": self.seq}, separators=(",", ":"))
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.old_journal_path):
+                # A previous compaction never finished, keep both journals.
+                with open(self.journal_path, "r") as src, open(self.old_journal_path, "a") as dst:
+                    dst.write(src.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.old_journal_path)
+        self.pending = 0
+        return payload
+
+    def finish_compaction(self, payload):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.error = e
+            raise
+        self.error = None
+        if os.path.exists(self.old_journal_path):
+            os.remove(self.old_journal_path)
+
+    def compact(self, data):
+        self.finish_compaction(self.begin_compaction(data))
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+# ================= WRITE-BEHIND =================
+# Front for JournalStore that takes all disk I/O off the event loop. append()
+# only serializes the record and queues it. One writer thread wakes at most
+# once per `interval`, appends everything queued since its last pass in a
+# single write with one fsync, so a burst of claims costs one disk write.
+# The thread keeps its own copy of the state, built from those same records,
+# and writes snapshots from it, so compaction never reads the live dict
+# while the bot is changing it. close() flushes whatever is still queued.
+
+class WriteBehindStore:
+    def __init__(self, journal, interval=FLUSH_INTERVAL):
+        self.journal = journal
+        self.interval = interval
+        self.seq = 0
+        self.writes = 0  # Journal writes, each covering one or more records
+        # Last failed write, cleared once a snapshot has been written successfully.
+        self.error = None
+        self._queue = []  # serialized records
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._shadow = None
+        self._thread = None
+
+    def load(self, default):
+        data = self.journal.load(default)
+        self.seq = self.journal.seq
+        # Independent of `data`, only the writer thread touches it from here on.
+        self._shadow = json.loads(json.dumps(data))
+        self._thread = threading.Thread(target=self._run, name="persister", daemon=True)
+        self._thread.start()
+        return data
+
+    # --- Event loop side ---
+    def append(self, op, **fields):
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "op": op, **fields}, separators=(",", ":"))
+        self._put(line)
+
+    def _put(self, line):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("store is closed")
+            self._queue.append(line)
+            self._cond.notify_all()
+
+    def queued(self):
+        """Items waiting for the writer thread."""
+        return len(self._queue)
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far is on disk. Returns False on timeout."""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.journal.close()
+
+    # --- Writer thread ---
+    def _run(self):
+        last_write = 0.0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                # Debounce: let the rest of a burst pile up before writing.
+                delay = last_write + self.interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait_for(lambda: self._closed, delay)
+                batch, self._queue = self._queue, []
+                self._busy = True
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.error = e
+                print(f"❌ Saving data failed: {e}")
+            last_write = time.monotonic()
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _write(self, batch):
+        # After a failed write only a snapshot of the shadow state is trusted.
+        snapshot = self.error is not None
+        for line in batch:
+            rec = json.loads(line)
+            apply_record(self._shadow, rec)
+            self.journal.seq = rec["seq"]
+
+        if not snapshot:
+            self.journal.pending += len(batch)
+            try:
+                self.journal.append_lines(batch, sync=True)
+                self.writes += 1
+            except OSError:
+                # The records are in the shadow state; a snapshot recovers them.
+                snapshot = True
+        if snapshot or self.journal.needs_compaction():
+            self.journal.compact(self._shadow)
+            self.writes += 1
+            self.error = None
+
+
+# ================= SQLITE STORAGE =================
+# Optional backend (STORAGE_BACKEND=sqlite). The bot still works on the
+# in-memory `data` dict; every mutation is mirrored into SQLite on a single
+# worker thread so the event loop never waits on disk. Duplicate, booking and
+# expiry questions are answered from that dict's indexes (NameIndex and
+# ExpiryIndex in main.py), not from SQL. The unique indexes on the normalized
+# team and player names back those checks up: a mirror write that breaks one
+# fails as a store error instead of being skipped, so the database never
+# quietly drifts from the bot's state. All tables are keyed by guild.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (
+    guild TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    team TEXT NOT NULL,
+    team_norm TEXT NOT NULL,
+    last_updated TEXT,
+    PRIMARY KEY (guild, uid)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS teams_team_norm ON teams(guild, team_norm);
+
+CREATE TABLE IF NOT EXISTS players (
+    guild TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    PRIMARY KEY (guild, uid, position),
+    FOREIGN KEY (guild, uid) REFERENCES teams(guild, uid) ON DELETE CASCADE
+);
+-- Blank optional players are kept (positions matter) but never count as duplicates, as in NameIndex.
+CREATE UNIQUE INDEX IF NOT EXISTS players_name_norm ON players(guild, name_norm) WHERE name_norm <> '';
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    UNIQUE (guild, slot, uid)
+);
+CREATE INDEX IF NOT EXISTS bookings_uid ON bookings(guild, uid);
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    UNIQUE (guild, slot, uid)
+);
+
+CREATE TABLE IF NOT EXISTS table_messages (
+    guild TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (guild, slot)
+);
+
+CREATE TABLE IF NOT EXISTS verified (
+    guild TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    team TEXT,
+    verified_by TEXT,
+    verified_at INTEGER,
+    PRIMARY KEY (guild, uid)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Tables whose rows belong to one guild's partition.
+GUILD_TABLES = ("bookings", "waitlist", "players", "teams", "table_messages", "verified")
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+class SQLiteStore:
+    def __init__(self, path, json_path=None):
+        self.path = path
+        self.json_path = json_path
+        # One thread owns the connection, so writes are serialized and stay in order.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = None
+        # Last failed mirror write, cleared by the next one that succeeds.
+        self.error = None
+
+    def _submit(self, fn, *args):
+        return self._executor.submit(fn, *args)
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    # --- Loading ---
+    def load(self, default):
+        return self._submit(self._load, default).result()
+
+    def _load(self, default):
+        conn = self._connect()
+        migrated = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+        if not migrated and self.json_path and os.path.exists(self.json_path):
+            self._migrate(self.json_path)
+
+        data = default
+        guilds = data.setdefault("guilds", {})
+
+        def part(guild):
+            if guild not in guilds:
+                guilds[guild] = new_partition()
+            return guilds[guild]
+
+        for guild, uid, team, last_updated in conn.execute("SELECT guild, uid, team, last_updated FROM teams"):
+            part(guild)["teams"][uid] = {"team": team, "players": [], "booked_slots": [], "last_updated": last_updated}
+        for guild, uid, name in conn.execute("SELECT guild, uid, name FROM players ORDER BY guild, uid, position"):
+            part(guild)["teams"][uid]["players"].append(name)
+        for guild, slot, uid in conn.execute("SELECT guild, slot, uid FROM bookings ORDER BY id"):
+            p = part(guild)
+            p["slots"].setdefault(slot, []).append(uid)
+            if uid in p["teams"]:
+                p["teams"][uid]["booked_slots"].append(slot)
+        for guild, slot, uid in conn.execute("SELECT guild, slot, uid FROM waitlist ORDER BY id"):
+            part(guild)["waitlists"].setdefault(slot, []).append(uid)
+        for guild, slot, message_id in conn.execute("SELECT guild, slot, message_id FROM table_messages"):
+            part(guild)["table_messages"][slot] = message_id
+        for guild, uid, team, by, at in conn.execute("SELECT guild, uid, team, verified_by, verified_at FROM verified"):
+            part(guild)["verified"][uid] = {"team": team, "by": by, "at": at}
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schedule'").fetchone()
+        if row:
+            data["schedule"] = json.loads(row[0])
+        return data
+
+    # --- Migration from data.json ---
+    def _migrate(self, json_path):
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        seq = data.pop("_seq", 0)
+        upgrade_layout(data)
+        # Fold in anything still sitting in the journal.
+        journal = JournalStore(json_path)
+        for path in (journal.old_journal_path, journal.journal_path):
+            for rec in journal._read_journal(path):
+                if rec["seq"] > seq:
+                    apply_record(data, rec)
+        self._replace_all(data)
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (json_path,))
+        self._conn.commit()
+        teams = sum(len(p["teams"]) for p in data["guilds"].values())
+        print(f"📦 Migrated {teams} teams from {json_path} to {self.path}")
+
+    def _replace_all(self, data):
+        conn = self._connect()
+        with conn:
+            for table in GUILD_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            for guild, part in data["guilds"].items():
+                for uid, info in part["teams"].items():
+                    self._upsert_team(conn, guild, uid, info)
+                for slot, uids in part["slots"].items():
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO bookings (guild, slot, uid) VALUES (?, ?, ?)",
+                        [(guild, slot, uid) for uid in uids]
+                    )
+                for slot, uids in part.get("waitlists", {}).items():
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO waitlist (guild, slot, uid) VALUES (?, ?, ?)",
+                        [(guild, slot, uid) for uid in uids]
+                    )
+                conn.executemany(
+                    "INSERT INTO table_messages (guild, slot, message_id) VALUES (?, ?, ?)",
+                    [(guild, slot, message_id) for slot, message_id in part["table_messages"].items()]
+                )
+                conn.executemany(
+                    "INSERT INTO verified (guild, uid, team, verified_by, verified_at) VALUES (?, ?, ?, ?, ?)",
+                    [(guild, uid, v["team"], v.get("by"), v.get("at")) for uid, v in part.get("verified", {}).items()]
+                )
+            if "schedule" in data:
+                self._save_schedule(conn, data["schedule"])
+
+    def _save_schedule(self, conn, schedule):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schedule', ?)", (json.dumps(schedule),))
+
+    def _upsert_team(self, conn, guild, uid, info):
+        # A duplicate name raises IntegrityError and rolls back the whole record; see _apply.
+        conn.execute("DELETE FROM players WHERE guild = ? AND uid = ?", (guild, uid))
+        conn.execute(
+            "INSERT INTO teams (guild, uid, team, team_norm, last_updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(guild, uid) DO UPDATE SET team = excluded.team, team_norm = excluded.team_norm, "
+            "last_updated = excluded.last_updated",
+            (guild, uid, info.get("team", ""), normalize(info.get("team", "")), info.get("last_updated"))
+        )
+        conn.executemany(
+            "INSERT INTO players (guild, uid, position, name, name_norm) VALUES (?, ?, ?, ?, ?)",
+            [(guild, uid, position, name, normalize(name)) for position, name in enumerate(info.get("players", []))]
+        )
+
+    # --- Writing ---
+    def append(self, op, **fields):
+        self._submit(self._apply, op, fields)
+
+    def _apply(self, op, rec):
+        try:
+            self._apply_record(op, rec)
+            self.error = None
+        except sqlite3.Error as e:
+            self.error = e
+            print(f"❌ SQLite write '{op}' failed: {e}")
+
+    def _apply_record(self, op, rec):
+        conn = self._connect()
+        guild = rec.get("guild", LEGACY_GUILD)
+        with conn:
+            if op == "batch":
+                for sub in rec["records"]:
+                    self._apply_op(conn, guild, sub["op"], sub)
+            else:
+                self._apply_op(conn, guild, op, rec)
+
+    def _apply_op(self, conn, guild, op, rec):
+        if op == "claim":
+            conn.execute(
+                "INSERT OR IGNORE INTO bookings (guild, slot, uid) VALUES (?, ?, ?)",
+                (guild, rec["slot"], rec["uid"])
+            )
+        elif op == "release":
+            conn.execute(
+                "DELETE FROM bookings WHERE guild = ? AND slot = ? AND uid = ?",
+                (guild, rec["slot"], rec["uid"])
+            )
+        elif op == "waitlist_join":
+            conn.execute(
+                "INSERT OR IGNORE INTO waitlist (guild, slot, uid) VALUES (?, ?, ?)",
+                (guild, rec["slot"], rec["uid"])
+            )
+        elif op in ("waitlist_leave", "promote"):
+            conn.execute(
+                "DELETE FROM waitlist WHERE guild = ? AND slot = ? AND uid = ?",
+                (guild, rec["slot"], rec["uid"])
+            )
+            if op == "promote":
+                conn.execute(
+                    "INSERT OR IGNORE INTO bookings (guild, slot, uid) VALUES (?, ?, ?)",
+                    (guild, rec["slot"], rec["uid"])
+                )
+        elif op == "import":
+            for uid, info in rec["teams"].items():
+                self._upsert_team(conn, guild, uid, info)
+            conn.executemany(
+                "DELETE FROM waitlist WHERE guild = ? AND slot = ? AND uid = ?",
+                [(guild, slot, uid) for slot, uid in rec["claims"]]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO bookings (guild, slot, uid) VALUES (?, ?, ?)",
+                [(guild, slot, uid) for slot, uid in rec["claims"]]
+            )
+        elif op == "team_upsert":
+            self._upsert_team(conn, guild, rec["uid"], rec["team"])
+        elif op == "team_delete":
+            conn.execute("DELETE FROM teams WHERE guild = ? AND uid = ?", (guild, rec["uid"]))
+        elif op == "table_message":
+            conn.execute(
+                "INSERT OR REPLACE INTO table_messages (guild, slot, message_id) VALUES (?, ?, ?)",
+                (guild, rec["slot"], rec["message_id"])
+            )
+        elif op == "reset":
+            conn.execute("DELETE FROM bookings WHERE guild = ?", (guild,))
+            conn.execute("DELETE FROM waitlist WHERE guild = ?", (guild,))
+        elif op == "verify":
+            conn.executemany(
+                "INSERT OR REPLACE INTO verified (guild, uid, team, verified_by, verified_at) VALUES (?, ?, ?, ?, ?)",
+                [(guild, uid, rec["team"], rec.get("by"), rec["at"]) for uid in rec["members"]]
+            )
+        elif op == "unverify":
+            conn.executemany(
+                "DELETE FROM verified WHERE guild = ? AND uid = ?",
+                [(guild, uid) for uid in rec["members"]]
+            )
+        elif op == "guild_adopt":
+            for table in GUILD_TABLES:
+                conn.execute(f"UPDATE {table} SET guild = ? WHERE guild = ?", (rec["guild"], rec["from"]))
+        elif op in ("job_set", "job_remove", "job_run"):
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schedule'").fetchone()
+            holder = {"schedule": json.loads(row[0])} if row else {}
+            apply_record(holder, {"op": op, **rec})
+            self._save_schedule(conn, holder["schedule"])
+
+    def queued(self):
+        """Writes waiting for the worker thread."""
+        return self._executor._work_queue.qsize()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    # One-shot migration: python storage.py data.json data.db
+    import sys
+    json_file = sys.argv[1] if len(sys.argv) > 1 else "data.json"
+    db_file = sys.argv[2] if len(sys.argv) > 2 else "data.db"
+    db = SQLiteStore(db_file, json_file)
+    db.load({"guilds": {}})
+    db.close()